@@ -0,0 +1,225 @@
+# Erlang Library for contact center operations forecasting
+# Erlang A - the M/M/n+M queue with abandonment
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import math
+import numpy as np
+
+# KPIs reported by ErlangA.KPI, named like the keys of Erlang.IntervalKPI
+Kpis = ('utilisation', 'sla', 'asa', 'abandon', 'queued', 'queue_time', 'queue_size')
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangA
+#   -------------------------------------------------------------------------------------------
+#   Erlang C assumes callers wait for as long as it takes. Erlang A gives every caller an
+#   exponentially distributed patience with mean abnt, after which they abandon. Callers that
+#   abandon free the queue for the callers behind them, so fewer agents are needed for the
+#   same service level than Erlang C says.
+#
+#   With the rates per interval lambda = transactions, mu = deathrate and theta = interval/abnt
+#   and t_j = prod_{i=1..j} lambda / (n*mu + i*theta) the probability to wait is
+#
+#       P(wait) = B*J / (1 + B*(J - 1)),   J = sum_{j>=0} t_j,   B = ErlangB(n, lambda/mu)
+#
+#   and a caller that has to wait finds j callers ahead with probability t_j / J. Such a caller
+#   is served with probability c/(c+j+1), c = n*mu/theta, and the time it would have to wait
+#   if it never abandoned is -ln(U)/theta with U ~ Beta(c, j+1). The service level is then a
+#   regularised incomplete beta function with an integer parameter, which is evaluated as a
+#   negative binomial distribution function.
+#
+#   All sums are taken in log space and normalised by J, so the evaluation is stable for
+#   thousands of agents and for overloaded queues where J overflows a float. The methods work
+#   on numpy arrays, the scalar methods are the batch methods applied to one value.
+#   -------------------------------------------------------------------------------------------
+class ErlangA:
+    # largest number of agents the staffing solver will try
+    MaxAgents = 65535
+    # number of (row, callers ahead) terms evaluated at once, bounds the memory used
+    MaxTerms  = 1 << 22
+
+    #   __init__ (Erlang)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   erlang - Erlang object with the queue parameters (sla, aht, abnt, interval)
+    def __init__(self, erlang):
+        self.erlang = erlang
+
+    #   -------------------------------------------------------------------------------------------
+    #   KPI_batch (array, array, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       agents       = array of numbers of agents available
+    #       transactions = array of the number of transactions received in the interval
+    #       service_time = target answer time in seconds e.g. 15
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict of arrays) - for every (agents, transactions) pair:
+    #       queued      - probability a caller has to wait
+    #       abandon     - probability a caller abandons
+    #       sla         - probability a caller is answered within service_time
+    #       asa         - average wait of the answered callers in seconds
+    #       queue_time  - average wait of the callers that had to wait in seconds
+    #       queue_size  - average number of callers waiting
+    #       utilisation - agent occupancy, only answered callers are handled
+    #   -------------------------------------------------------------------------------------------
+    def KPI_batch(self, agents, transactions, service_time):
+        agents, transactions = np.broadcast_arrays(np.asarray(agents, dtype=float),
+                                                   np.asarray(transactions, dtype=float))
+        shape = agents.shape
+        n = np.floor(agents.ravel())
+        lam = transactions.ravel()
+        result = {name: np.zeros(n.size) for name in Kpis}
+        valid = np.nonzero((n > 0) & (lam > 0))[0]
+        if valid.size:
+            mu = self.erlang.deathrate
+            theta = self.erlang.interval / self.erlang.abnt
+            # callers ahead beyond the peak of t_j (at (lam - n*mu)/theta) fall off like a normal
+            # distribution of variance lam/theta, this bound leaves out less than e^-70 of J
+            bound = np.ceil(np.maximum(0, (lam[valid] - n[valid] * mu) / theta)
+                            + 12 * np.sqrt(lam[valid] / theta + 1) + 30).astype(int)
+            order = np.argsort(bound, kind='stable')
+            first = 0
+            while first < order.size:
+                # rows are taken in order of their bound, so a chunk needs few extra terms
+                stop = first + 1
+                while stop < order.size and (stop + 1 - first) * bound[order[stop]] <= self.MaxTerms:
+                    stop += 1
+                rows = valid[order[first:stop]]
+                count = int(bound[order[stop - 1]])
+                part = self.Terms(n[rows], lam[rows], count, service_time, mu, theta)
+                for name in Kpis:
+                    result[name][rows] = part[name]
+                first = stop
+        return {name: value.reshape(shape) for name, value in result.items()}
+
+    #   -------------------------------------------------------------------------------------------
+    #   Terms (array, array, int, int, float, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Evaluates the KPIs of KPI_batch for agents n > 0 and transactions lam > 0 over count
+    #   terms j = 0 .. count-1 of callers ahead.
+    #   -------------------------------------------------------------------------------------------
+    def Terms(self, n, lam, count, service_time, mu, theta):
+        interval = self.erlang.interval
+        B = self.erlang.ErlangB_batch(n, lam / mu)
+        c = (n * mu / theta)[:, None]
+        j = np.arange(count, dtype=float)[None, :]
+        # log t_j, t_0 = 1
+        logt = np.zeros((n.size, count))
+        logt[:, 1:] = np.cumsum(np.log(lam)[:, None] - np.log((c + j[:, 1:]) * theta), axis=1)
+        top = logt.max(axis=1, keepdims=True)
+        logJ = top + np.log(np.exp(logt - top).sum(axis=1, keepdims=True))
+        # distribution of the callers ahead of a caller that has to wait
+        q = np.exp(logt - logJ)
+        logJ = logJ[:, 0]
+        with np.errstate(divide='ignore', over='ignore'):
+            # P(wait) = 1 / (1 + (1 - B) / (B * J))
+            queued = np.where(B > 0, 1 / (1 + np.exp(np.log1p(-B) - np.log(B) - logJ)), 0.0)
+        served = c / (c + j + 1)
+        ahead = (q * j).sum(axis=1)
+        queue_size = queued * ahead
+        abandon = np.minimum(1.0, theta * queue_size / lam)
+        # mean wait of a served caller with j ahead: sum_{m=1..j+1} 1/(c+m) / theta
+        wait = np.cumsum(1 / (c + j + 1), axis=1) / theta
+        answered = 1 - abandon
+        with np.errstate(divide='ignore', invalid='ignore'):
+            asa = np.where(answered > 0, queued * (q * served * wait).sum(axis=1) / answered, 0.0)
+            queue_time = np.where(queued > 0, queue_size / lam / queued, 0.0)
+        # P(answered within t | j) = c/(c+j+1) * P(K >= j+1), K ~ NegBin(c+1, x), x = e^(-theta*t)
+        t = service_time / interval
+        if t > 0:
+            a = c + 1
+            logx = -theta * t
+            k = j
+            with np.errstate(divide='ignore'):
+                logpmf = a * logx + k * math.log(-math.expm1(logx))
+            logpmf[:, 1:] += np.cumsum(np.log(a + k[:, :-1]) - np.log(k[:, 1:]), axis=1)
+            within = np.clip(1 - np.cumsum(np.exp(logpmf), axis=1), 0, 1)
+        else:
+            within = np.zeros_like(q)
+        sla = (1 - queued) + queued * (q * served * within).sum(axis=1)
+        return {
+            'utilisation': np.clip(lam * answered / (n * mu), 0, 1),
+            'sla':         np.clip(sla, 0, 1),
+            'asa':         asa * interval,
+            'abandon':     np.clip(abandon, 0, 1),
+            'queued':      np.clip(queued, 0, 1),
+            'queue_time':  queue_time * interval,
+            'queue_size':  queue_size,
+        }
+
+    #   -------------------------------------------------------------------------------------------
+    #   KPI (int, float, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - the KPIs of KPI_batch for one number of agents and transactions.
+    #   -------------------------------------------------------------------------------------------
+    def KPI(self, agents, transactions, service_time):
+        kpi = self.KPI_batch([agents], [transactions], service_time)
+        return {name: float(value[0]) for name, value in kpi.items()}
+
+    def Queued(self, agents, transactions):
+        return self.KPI(agents, transactions, 0)['queued']
+
+    def Abandon(self, agents, transactions):
+        return self.KPI(agents, transactions, 0)['abandon']
+
+    def ASA(self, agents, transactions):
+        return self.KPI(agents, transactions, 0)['asa']
+
+    def SLA(self, agents, transactions, service_time):
+        return self.KPI(agents, transactions, service_time)['sla']
+
+    #   -------------------------------------------------------------------------------------------
+    #   Agents_batch (int, array, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       service_time = target answer time in seconds e.g. 15
+    #       transactions = array of the number of transactions received in the interval
+    #       abandon      = optional largest abandon rate allowed e.g. 0.05
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters provided in Class Constructor:
+    #       sla  = % of calls to be answered within the ServiceTime period  e.g. 0.95 (95%).
+    #       abnt = mean patience of a caller in seconds.
+    #   -------------------------------------------------------------------------------------------
+    #   The service level grows and the abandon rate falls with every agent added, so the number
+    #   of agents is bracketed by doubling and then bisected, for all transactions at once.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of int) - the fewest agents meeting the sla (and abandon) target for each
+    #                            number of transactions, 0 for no transactions.
+    #   -------------------------------------------------------------------------------------------
+    def Agents_batch(self, service_time, transactions, abandon=None):
+        transactions = np.asarray(transactions, dtype=float)
+        shape = transactions.shape
+        lam = transactions.ravel()
+        sla = min(self.erlang.sla, 1 - self.erlang.MaxAccuracy)
+
+        def Meets(agents, rows):
+            kpi = self.KPI_batch(agents, lam[rows], service_time)
+            ok = kpi['sla'] >= sla
+            if abandon is not None:
+                ok &= kpi['abandon'] <= abandon
+            return ok
+
+        todo = np.nonzero(lam > 0)[0]
+        lo = np.zeros(lam.size)
+        hi = np.maximum(1, np.ceil(lam / self.erlang.deathrate))
+        # double hi until it meets the target, the last failing value is a lower bound
+        active = todo
+        while active.size:
+            ok = Meets(hi[active], active)
+            failed = active[~ok]
+            lo[failed] = hi[failed]
+            hi[failed] = np.minimum(hi[failed] * 2, self.MaxAgents)
+            active = failed[lo[failed] < self.MaxAgents]
+        # lo fails (or is 0), hi meets the target
+        active = todo[hi[todo] - lo[todo] > 1]
+        while active.size:
+            mid = np.floor((lo[active] + hi[active]) / 2)
+            ok = Meets(mid, active)
+            hi[active[ok]] = mid[ok]
+            lo[active[~ok]] = mid[~ok]
+            active = active[hi[active] - lo[active] > 1]
+        agents = np.where(lam > 0, hi, 0).astype(int)
+        return agents.reshape(shape)
+
+    def Agents(self, service_time, transactions, abandon=None):
+        return int(self.Agents_batch(service_time, [transactions], abandon)[0])
@@ -3,6 +3,8 @@
 # Copyright (c) 2020 by Peter Gossler
 # Version 0.1.0
 
+import math
+
 class Erlang_Base:
     def __init__(self):
         pass
@@ -37,4 +39,58 @@ class Erlang_Base:
     @staticmethod
     # Convert a number of hours into seconds
     def hours_to_secs (val):
-        return int((val * 3600 + 0.5)//1)
\ No newline at end of file
+        return int((val * 3600 + 0.5)//1)
+
+    @staticmethod
+    # Convert a time measured in intervals (the unit of the per interval rates) into seconds
+    def intervals_to_secs (val, interval):
+        return int((val * interval + 0.5)//1)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Helpers for evaluating ErlangB through the incomplete gamma function. Poisson probabilities
+    #   are computed with Loader's saddle point expansion, which keeps the full float precision
+    #   for large counts instead of losing it in lgamma / log cancellation.
+    #   -------------------------------------------------------------------------------------------
+
+    @staticmethod
+    # Error of Stirling's approximation: log(n!) - log(sqrt(2*pi*n) * (n/e)^n)
+    def StirlingError (n):
+        if n <= 15:
+            return math.lgamma(n + 1) - (n + 0.5) * math.log(n) + n - 0.5 * math.log(2 * math.pi)
+        nn = n * n
+        S0, S1, S2, S3, S4 = 1/12, 1/360, 1/1260, 1/1680, 1/1188
+        if n > 500:
+            return (S0 - S1 / nn) / n
+        if n > 80:
+            return (S0 - (S1 - S2 / nn) / nn) / n
+        if n > 35:
+            return (S0 - (S1 - (S2 - S3 / nn) / nn) / nn) / n
+        return (S0 - (S1 - (S2 - (S3 - S4 / nn) / nn) / nn) / nn) / n
+
+    @staticmethod
+    # Deviance term x*log(x/mean) + mean - x, evaluated without cancellation when x ~ mean
+    def PoissonDeviance (x, mean):
+        if abs(x - mean) < 0.1 * (x + mean):
+            v = (x - mean) / (x + mean)
+            s = (x - mean) * v
+            ej = 2 * x * v
+            v = v * v
+            j = 1
+            while True:
+                ej *= v
+                s1 = s + ej / (2 * j + 1)
+                if s1 == s:
+                    return s1
+                s = s1
+                j += 1
+        return x * math.log(x / mean) + mean - x
+
+    @staticmethod
+    # Probability of exactly n events of a Poisson distribution with the given mean
+    def PoissonPmf (n, mean):
+        if mean == 0:
+            return 1.0 if n == 0 else 0.0
+        if n == 0:
+            return math.exp(-mean)
+        return math.exp(-Erlang_Base.StirlingError(n) - Erlang_Base.PoissonDeviance(n, mean)) \
+            / math.sqrt(2 * math.pi * n)
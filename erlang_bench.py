@@ -0,0 +1,208 @@
+# Erlang Library for contact center operations forecasting
+# Benchmark runner
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+#
+# Times the Erlang methods for small, medium and large queues and writes the results as JSON,
+# so that runs of different commits can be compared:
+#
+#   python erlang_bench.py --output before.json
+#   python erlang_bench.py --output after.json --compare before.json
+#
+# --compare exits with status 1 if any case got slower than --threshold (default 1.25 = 25%).
+# The startup/ cases time the import of erlang_c in a fresh interpreter and the creation of
+# Erlang objects, per object.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import erlang_c
+
+# queue sizes in agents
+Sizes = {'small': 10, 'medium': 500, 'large': 5000}
+
+# (sla, tta, ait, aiw, abnt, max_wait, nv, ccc, interval, ops_hrs)
+Profile      = (0.80, 30, 300, 40, 20, 30, False, 1, 60, 16)
+ServiceTime  = 30
+Occupancy    = 0.9
+# objects created per timed run of the startup cases
+Instances    = 1000
+
+#   -------------------------------------------------------------------------------------------
+#   Cases (Erlang, int)
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - case name -> function without arguments running the case once, for a
+#                    queue of the given number of agents running at about 90% occupancy.
+#   -------------------------------------------------------------------------------------------
+def Cases(ec, agents):
+    intensity    = agents * Occupancy
+    transactions = int(intensity * ec.interval / ec.aht)
+    return {
+        'ErlangB':                lambda: ec.ErlangB(agents, intensity),
+        'ErlangC':                lambda: ec.ErlangC(agents, intensity),
+        'Agents':                 lambda: ec.Agents(ServiceTime, transactions),
+        'FractionalAgents':       lambda: ec.FractionalAgents(ServiceTime, transactions),
+        'AgentASA':               lambda: ec.AgentASA(ServiceTime, transactions),
+        'CallCapacity':           lambda: ec.CallCapacity(agents, ServiceTime),
+        'FractionalCallCapacity': lambda: ec.FractionalCallCapacity(ServiceTime, agents),
+        'NBTrunks':               lambda: ec.NBTrunks(intensity, 0.01),
+        'Trunks':                 lambda: ec.Trunks(agents, transactions),
+    }
+
+#   -------------------------------------------------------------------------------------------
+#   TimeCase (function, int, float)
+#   -------------------------------------------------------------------------------------------
+#   Runs case at least once and then up to repeat times, stopping early once budget seconds
+#   have been spent on it.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - runs and min / median / mean time per call in seconds.
+#   -------------------------------------------------------------------------------------------
+def TimeCase(case, repeat, budget):
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat:
+        t = time.perf_counter()
+        case()
+        times.append(time.perf_counter() - t)
+        if time.perf_counter() - start > budget:
+            break
+    return {'runs': len(times), 'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.fmean(times)}
+
+#   -------------------------------------------------------------------------------------------
+#   StartupCases ()
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - case name -> function without arguments creating Instances objects.
+#   -------------------------------------------------------------------------------------------
+def StartupCases():
+    params = erlang_c.ErlangParams(*Profile)
+    def Create(make):
+        def case():
+            for i in range(Instances):
+                make()
+        return case
+    return {
+        'Erlang':       Create(lambda: erlang_c.Erlang(*Profile)),
+        'ErlangParams': Create(lambda: erlang_c.ErlangParams(*Profile)),
+        'FromParams':   Create(lambda: erlang_c.Erlang.FromParams(params)),
+    }
+
+#   -------------------------------------------------------------------------------------------
+#   TimeImport (int, float)
+#   -------------------------------------------------------------------------------------------
+#   Imports erlang_c in a fresh interpreter up to repeat times, stopping early once budget
+#   seconds have been spent. Only the import itself is timed, not the interpreter start.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - runs and min / median / mean import time in seconds.
+#   -------------------------------------------------------------------------------------------
+def TimeImport(repeat, budget):
+    code = "import time; t = time.perf_counter(); import erlang_c; print(time.perf_counter() - t)"
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat:
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(float(result.stdout))
+        if time.perf_counter() - start > budget:
+            break
+    return {'runs': len(times), 'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.fmean(times)}
+
+def GitCommit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+#   -------------------------------------------------------------------------------------------
+#   Run (list, list, int, float)
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - JSON serialisable benchmark report.
+#   -------------------------------------------------------------------------------------------
+def Run(sizes, methods=None, repeat=20, budget=2.0, startup=True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        ec = erlang_c.Erlang(*Profile)
+    results = {}
+    if startup:
+        if not methods or 'import' in methods:
+            results['startup/import'] = TimeImport(repeat, budget)
+        for name, case in StartupCases().items():
+            if methods and name not in methods:
+                continue
+            result = TimeCase(case, repeat, budget)
+            for key in ('min', 'median', 'mean'):
+                result[key] /= Instances
+            results['startup/' + name] = result
+    for size in sizes:
+        cases = Cases(ec, Sizes[size])
+        for name, case in cases.items():
+            if methods and name not in methods:
+                continue
+            results[size + '/' + name] = TimeCase(case, repeat, budget)
+    return {'commit': GitCommit(), 'python': platform.python_version(),
+            'machine': platform.machine(), 'repeat': repeat, 'budget': budget,
+            'instances': Instances if startup else None,
+            'sizes': {size: Sizes[size] for size in sizes}, 'results': results}
+
+#   -------------------------------------------------------------------------------------------
+#   Compare (dict, dict, float)
+#   -------------------------------------------------------------------------------------------
+#   Returns (list) - (case, baseline median, current median, ratio) for the cases in both
+#                    reports, and the list of cases whose ratio is above threshold.
+#   -------------------------------------------------------------------------------------------
+def Compare(baseline, current, threshold):
+    rows = []
+    slower = []
+    for case, result in current['results'].items():
+        if case not in baseline['results']:
+            continue
+        before = baseline['results'][case]['median']
+        ratio = result['median'] / before if before > 0 else float('inf')
+        rows.append((case, before, result['median'], ratio))
+        if ratio > threshold:
+            slower.append(case)
+    return rows, slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Erlang methods.')
+    parser.add_argument('--sizes', nargs='+', choices=list(Sizes), default=list(Sizes))
+    parser.add_argument('--methods', nargs='+', default=None, help='only run these methods')
+    parser.add_argument('--repeat', type=int, default=20, help='maximum runs per case')
+    parser.add_argument('--budget', type=float, default=2.0, help='maximum seconds per case')
+    parser.add_argument('--no-startup', dest='startup', action='store_false',
+                        help='skip the import and object creation cases')
+    parser.add_argument('--output', default=None, help='write the JSON report to this file')
+    parser.add_argument('--compare', default=None, help='JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio counted as a regression')
+    args = parser.parse_args(argv)
+
+    report = Run(args.sizes, args.methods, args.repeat, args.budget, args.startup)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, slower = Compare(baseline, report, args.threshold)
+        for case, before, after, ratio in rows:
+            print("{:40} {:12.6f}s {:12.6f}s {:8.2f}x".format(case, before, after, ratio),
+                  file=sys.stderr)
+        if slower:
+            print("Slower than threshold: " + ", ".join(slower), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
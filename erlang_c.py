@@ -3,15 +3,132 @@
 # Version 0.1.0
 
 import math
-from pathxtend.path import Path
+import threading
+from collections import OrderedDict
+from operator import attrgetter
 from erlang_base import Erlang_Base
+import erlang_core
+# numpy is only imported by the array methods (the _batch methods and plan) when first used
 
+#   -------------------------------------------------------------------------------------------
+#   ErlangParams
+#   -------------------------------------------------------------------------------------------
+#   Immutable, validated set of Erlang parameters. Takes the same arguments as the Erlang
+#   constructor and derives aht and deathrate the same way, but raises ValueError for invalid
+#   values. It does no I/O, so it is cheap to create, and it can be shared between any number of
+#   Erlang objects (see Erlang.FromParams) and used as a dict key.
+#   -------------------------------------------------------------------------------------------
+class ErlangParams:
+    __slots__ = ('sla', 'tta', 'ait', 'aiw', 'aht', 'abnt', 'max_wait', 'nv', 'ccc', 'interval',
+                 'ops_hrs', 'deathrate')
+    # returns the tuple of all fields, in __slots__ order
+    Values = attrgetter(*__slots__)
+
+    def __init__(self, sla, tta, ait, aiw, abnt, max_wait, nv, ccc, interval, ops_hrs):
+        if sla > 1.00 or sla <= 0:
+            raise ValueError("sla: 0 < sla <= 1.00!")
+        if tta <= 0:
+            raise ValueError("tta must be larger than 0!")
+        if (ait + aiw) <= 0:
+            raise ValueError("ait + aic must be larger than 0!")
+        if abnt <= 0:
+            raise ValueError("abnt must be larger than 0!")
+        if max_wait <= 0:
+            raise ValueError("max_wait must be larger than 0!")
+        if ccc <= 0:
+            raise ValueError("ccc must be larger than 0!")
+        if interval != 15 and interval != 30 and interval != 45 and interval != 60:
+            raise ValueError("Interval must be either 15, 30, 45 or 60 minutes!")
+        if ops_hrs != 8 and ops_hrs != 16 and ops_hrs != 24:
+            raise ValueError("ops_hrs must be either 8, 16 or 24 hours!")
+        if nv != True:
+            ccc = 1
+        aht = aiw + ait
+        # Check if an agent can take more than 1 interaction, in the case of chat etc.
+        if nv and ccc > 1:
+            aht = ((ait / ccc) + aiw * ccc)
+        interval = interval * 60 # convert interval from minutes to seconds
+        init = object.__setattr__
+        init(self, 'sla', sla)
+        init(self, 'tta', tta)
+        init(self, 'ait', ait)
+        init(self, 'aiw', aiw)
+        init(self, 'aht', aht)
+        init(self, 'abnt', abnt)
+        init(self, 'max_wait', max_wait)
+        init(self, 'nv', nv)
+        init(self, 'ccc', ccc)
+        init(self, 'interval', interval)
+        init(self, 'ops_hrs', ops_hrs)
+        init(self, 'deathrate', interval / aht)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ErlangParams is immutable!")
+
+    def __delattr__(self, name):
+        raise AttributeError("ErlangParams is immutable!")
+
+    def Fields(self):
+        return dict(zip(self.__slots__, ErlangParams.Values(self)))
+
+    def __eq__(self, other):
+        if not isinstance(other, ErlangParams):
+            return NotImplemented
+        return ErlangParams.Values(self) == ErlangParams.Values(other)
+
+    def __hash__(self):
+        return hash(ErlangParams.Values(self))
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(name, value) for name, value in self.Fields().items())
+        return 'ErlangParams(' + fields + ')'
+
+    #   -------------------------------------------------------------------------------------------
+    #   FromFields (dict)
+    #   -------------------------------------------------------------------------------------------
+    #   Creates the record from values that are already derived (aht, deathrate, interval in
+    #   seconds), e.g. the attributes of an Erlang object. Nothing is validated or recalculated.
+    #   -------------------------------------------------------------------------------------------
+    @classmethod
+    def FromFields(cls, fields):
+        params = object.__new__(cls)
+        for name in cls.__slots__:
+            object.__setattr__(params, name, fields[name])
+        return params
+
+#   -------------------------------------------------------------------------------------------
+#   Erlang
+#   -------------------------------------------------------------------------------------------
+#   One queue profile and the methods calculating its staffing and KPIs. An object can be shared
+#   by threads that only call its methods: the parameter record (Params) and the result cache
+#   are guarded by locks. The statistics (EnableStats) are not thread safe, and the parameters
+#   must not be changed while other threads use the object.
+#   -------------------------------------------------------------------------------------------
 class Erlang:
-    err_val_ltz = 'Value error - parameter cannot be less than 0'
+    err_val_ltz = erlang_core.ErrValLtz
     base        = Erlang_Base
     MaxLoops    = 100
-    MaxAccuracy = 1E-05
+    MaxAccuracy = erlang_core.MaxAccuracy
     deathrate   = 0
+    ErlangBMethods = erlang_core.ErlangBMethods
+    MaxTrunks      = 65535
+    # evaluation paths of ErlangCStable and the digits of its decimal path
+    ErlangCModes     = ('auto', 'float', 'decimal')
+    ErlangCPrecision = 40
+    # optional ErlangB / ErlangC result cache, see EnableCache
+    cache          = None
+    cache_capacity = 0
+    cache_quantum  = 0
+    cache_hits     = 0
+    cache_misses   = 0
+    cache_lock     = None
+    # guards building and dropping the parameter record of every object, see Params
+    ParamsLock     = threading.Lock()
+    # optional method statistics, see EnableStats
+    stats          = None
+    # setting any of these clears the cache
+    cache_params = ('sla', 'tta', 'aht', 'ait', 'aiw', 'abnt', 'max_wait', 'nv', 'ccc',
+                    'interval', 'ops_hrs', 'deathrate')
     
     #   __init__ (float, int, int, int, int, int, bool, int, int, int)
     #   -------------------------------------------------------------------------------------------
@@ -28,53 +145,82 @@ class Erlang:
     #   ops_hrs   - Operational hours of the contact center e.g. 8, 16, 24
     def __init__(self, sla, tta, ait, aiw, abnt, max_wait, nv, ccc, interval, ops_hrs):
         try:
-            print("Erlang constructor called.")
-            self.local_dir = str(Path.script_dir())
-            if sla > 1.00 or sla <= 0:
-                raise ValueError("sla: 0 < sla <= 1.00!")
-            else:
-                self.sla = sla
-            if tta <= 0:
-                raise ValueError("tta must be larger than 0!")
-            else:
-                self.tta = tta
-            if (ait + aiw) <= 0:
-                raise ValueError("ait + aic must be larger than 0!")
-            else:
-                self.aht = aiw + ait
-                self.aiw = aiw
-                self.ait = ait
-            if abnt <= 0:
-                raise ValueError("abnt must be larger than 0!")
-            else:
-                self.abnt = abnt
-            if max_wait <= 0:
-                raise ValueError("max_wait must be larger than 0!")
-            else:
-                self.max_wait = max_wait
-            self.nv  = nv
-            if ccc <= 0:
-                raise ValueError("ccc must be larger than 0!")
-            else:
-                if self.nv != True:
-                    self.ccc = 1
-                else: 
-                    self.ccc = ccc
-            # Check if an agent can take more than 1 interaction, in the case of chat etc.
-            if self.nv and self.ccc > 1:
-                self.aht = ((self.ait / self.ccc) + self.aiw * self.ccc)
-            if interval != 15 and interval != 30 and interval != 45 and interval != 60:
-                raise ValueError("Interval must be either 15, 30, 45 or 60 minutes!")
-            else:
-                self.interval  = interval * 60 # convert interval from minutes to seconds
-            if ops_hrs != 8 and ops_hrs != 16 and ops_hrs != 24:  
-                raise ValueError("ops_hrs must be either 8, 16 or 24 hours!")
-            else:
-                self.ops_hrs   = ops_hrs
-            self.deathrate = self.interval / self.aht
+            self.UseParams(ErlangParams(sla, tta, ait, aiw, abnt, max_wait, nv, ccc, interval, ops_hrs))
         except ValueError as ve:
                 print (ve)
 
+    #   -------------------------------------------------------------------------------------------
+    #   FromParams (ErlangParams)
+    #   -------------------------------------------------------------------------------------------
+    #   Creates an Erlang object from already validated parameters without running the
+    #   constructor. Use this when many objects are created from the same few profiles.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (Erlang) - a new Erlang object using params.
+    #   -------------------------------------------------------------------------------------------
+    @classmethod
+    def FromParams(cls, params):
+        ec = object.__new__(cls)
+        ec.__dict__.update(params.Fields())
+        ec.__dict__['params'] = params
+        return ec
+
+    #   -------------------------------------------------------------------------------------------
+    #   UseParams (ErlangParams)
+    #   -------------------------------------------------------------------------------------------
+    #   Replaces all the parameters of the object by params.
+    #   -------------------------------------------------------------------------------------------
+    def UseParams(self, params):
+        # the cached results depend on the parameters, see __setattr__
+        with self.ParamsLock:
+            self.__dict__.update(params.Fields())
+            self.__dict__['params'] = params
+        if self.cache is not None:
+            with self.cache_lock:
+                self.cache.clear()
+
+    #   -------------------------------------------------------------------------------------------
+    #   Params ()
+    #   -------------------------------------------------------------------------------------------
+    #   The record is created once and dropped whenever one of the parameters of the object is
+    #   changed, see __setattr__.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (ErlangParams) - the current parameters of the object for the functions of
+    #                            erlang_core, None if the constructor failed.
+    #   -------------------------------------------------------------------------------------------
+    def Params(self):
+        params = self.__dict__.get('params')
+        if params is None:
+            with self.ParamsLock:
+                params = self.__dict__.get('params')
+                if params is None:
+                    try:
+                        params = ErlangParams.FromFields({name: getattr(self, name) for name in ErlangParams.__slots__})
+                    except AttributeError:
+                        return None
+                    self.__dict__['params'] = params
+        return params
+
+    #   -------------------------------------------------------------------------------------------
+    #   Evaluate (str, ...)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       name = one of erlang_core.Functions e.g. 'Agents'
+    #       args = arguments of the function, as for the method with the same name
+    #   -------------------------------------------------------------------------------------------
+    #   Evaluates the pure function of erlang_core on the parameters of the object, without the
+    #   cache and statistics and without printing.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (erlang_core.Result) - the value, or the error raised instead of returning 0.
+    #   -------------------------------------------------------------------------------------------
+    def Evaluate(self, name, *args):
+        return erlang_core.Evaluate(self.Params(), name, *args)
+
+    # only needed by print_info, so pathxtend is imported on first use
+    @property
+    def local_dir(self):
+        from pathxtend.path import Path
+        return str(Path.script_dir())
+
     def print_info (self):
         myerror = "SLA: {0}% / {1} sec"
         print (myerror.format(self.sla*100, self.tta))
@@ -95,7 +241,167 @@ class Erlang:
 
     def __DEL__ (self):
         print ("Erlang object deleted")
-        
+
+    def __setattr__(self, name, value):
+        if name in self.cache_params:
+            with self.ParamsLock:
+                object.__setattr__(self, name, value)
+                self.__dict__.pop('params', None)
+            if self.cache is not None:
+                with self.cache_lock:
+                    self.cache.clear()
+        else:
+            object.__setattr__(self, name, value)
+
+    ###############################################
+    ### Result Cache Related Functions          ###
+    ###############################################
+
+    #   -------------------------------------------------------------------------------------------
+    #   EnableCache (int, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       capacity = maximum number of ErlangB / ErlangC results kept, the least recently used
+    #                  result is dropped when the cache is full
+    #       quantum  = if larger than 0, intensities are rounded to the nearest multiple of quantum
+    #                  before they are evaluated, so that neighbouring intensities share a result.
+    #                  The rounding changes the values, and the batch forms (ErlangB_batch,
+    #                  ErlangC_batch, AgentsErlangC_batch) round the same way, so they agree with
+    #                  the scalar methods of the same object.
+    #   -------------------------------------------------------------------------------------------
+    #   The cache is off by default. It is cleared whenever one of the constructor parameters of
+    #   the object is changed. The cache and its counters are guarded by a lock, so threads can
+    #   share the object and its cache; copies of the object (copy.copy) share both.
+    #   -------------------------------------------------------------------------------------------
+    def EnableCache(self, capacity=4096, quantum=0):
+        try:
+            if capacity < 1:
+                raise ValueError("capacity must be larger than 0!")
+            if quantum < 0:
+                raise ValueError(''.join(self.err_val_ltz))
+            self.cache_lock     = threading.Lock()
+            self.cache          = OrderedDict()
+            self.cache_capacity = int(capacity)
+            self.cache_quantum  = quantum
+            self.cache_hits     = 0
+            self.cache_misses   = 0
+        except ValueError as ve:
+            print (ve)
+
+    def DisableCache(self):
+        self.cache = None
+
+    def ClearCache(self):
+        if self.cache is None:
+            return
+        with self.cache_lock:
+            self.cache.clear()
+            self.cache_hits   = 0
+            self.cache_misses = 0
+
+    #   -------------------------------------------------------------------------------------------
+    #   CacheInfo ()
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - hits, misses, size, capacity and quantum of the result cache.
+    #   -------------------------------------------------------------------------------------------
+    def CacheInfo(self):
+        cache = self.cache
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(cache) if cache is not None else 0,
+                'capacity': self.cache_capacity, 'quantum': self.cache_quantum}
+
+    def CacheQuantize(self, intensity):
+        if self.cache_quantum > 0:
+            return round(intensity / self.cache_quantum) * self.cache_quantum
+        return intensity
+
+    # array form of CacheQuantize, numpy rounds halves to even like round
+    def CacheQuantize_batch(self, intensity):
+        import numpy as np
+        if self.cache_quantum > 0:
+            return np.round(intensity / self.cache_quantum) * self.cache_quantum
+        return intensity
+
+    def CacheGet(self, key):
+        with self.cache_lock:
+            value = self.cache.get(key)
+            if value is None:
+                self.cache_misses += 1
+            else:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+        return value
+
+    def CachePut(self, key, value):
+        with self.cache_lock:
+            self.cache[key] = value
+            if len(self.cache) > self.cache_capacity:
+                self.cache.popitem(last=False)
+
+    ###############################################
+    ### Statistics Related Functions            ###
+    ###############################################
+
+    #   -------------------------------------------------------------------------------------------
+    #   EnableStats (str, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       label   = name of the queue or profile the statistics are exported under
+    #       samples = number of most recent latencies kept per method for the quantiles
+    #   -------------------------------------------------------------------------------------------
+    #   Statistics are off by default and cost nothing but a check per solver call then. Enabling
+    #   them replaces the methods listed in erlang_stats.Methods on this object by counted and
+    #   timed wrappers, see erlang_stats.ErlangStats. Copies of the object (copy.copy) add to the
+    #   same statistics.
+    #   -------------------------------------------------------------------------------------------
+    def EnableStats(self, label=None, samples=4096):
+        import erlang_stats
+        self.AttachStats(erlang_stats.ErlangStats(label, samples))
+
+    def AttachStats(self, stats):
+        import erlang_stats
+        self.DisableStats()
+        for name in erlang_stats.Methods:
+            self.__dict__[name] = stats.Wrap(name, getattr(self, name))
+        self.stats = stats
+
+    def DisableStats(self):
+        if self.stats is not None:
+            import erlang_stats
+            for name in erlang_stats.Methods:
+                self.__dict__.pop(name, None)
+            self.stats = None
+
+    def ResetStats(self):
+        if self.stats is not None:
+            self.stats.Reset()
+
+    #   -------------------------------------------------------------------------------------------
+    #   StatsInfo ()
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - per method called: calls, seconds, mean, p50, p90, p99, max and iterations,
+    #                    see erlang_stats.ErlangStats.Info. Empty if statistics are not enabled.
+    #   -------------------------------------------------------------------------------------------
+    def StatsInfo(self):
+        return self.stats.Info() if self.stats is not None else {}
+
+    #   -------------------------------------------------------------------------------------------
+    #   StatsText ()
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (str) - the statistics in the Prometheus text format, see erlang_stats.Prometheus.
+    #   -------------------------------------------------------------------------------------------
+    def StatsText(self):
+        import erlang_stats
+        return erlang_stats.Prometheus([self])
+
+    def __copy__(self):
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        if self.stats is not None:
+            other.DisableStats()
+            other.AttachStats(self.stats)
+        return other
+
     ###############################################
     ### Erlang Contact Center Related Functions ###
     ###############################################
@@ -106,23 +412,30 @@ class Erlang:
     #   Parameters:
     #       servers    = Number of telephone lines
     #       intensity  = Arrival rate of calls / Completion rate of calls
+    #       method     = 'recurrence' (default) - iterate the ErlangB recurrence up to servers
+    #                    'gamma' - evaluate through the incomplete gamma function, see ErlangBGamma
     #   -------------------------------------------------------------------------------------------
     #   Returns (float) - Probability in % of a call being blocked.
     #   -------------------------------------------------------------------------------------------
-    def ErlangB (self, servers, intensity):
-        B = 0.0
+    def ErlangB (self, servers, intensity, method='recurrence'):
         try:
             if servers < 0 or intensity < 0:
                 raise ValueError(''.join(self.err_val_ltz))
-            
-            maxiterate = self.base.FixInt(servers)
-            last = 1
-            i = 1
-            while i <= maxiterate:
-                B = (intensity * last) / (i + (intensity * last))
-                last = B
-                i += 1
-            return self.base.MinMax(B,0,1)
+            if method not in self.ErlangBMethods:
+                raise ValueError("method must be one of " + ", ".join(self.ErlangBMethods) + "!")
+            if self.cache is not None:
+                intensity = self.CacheQuantize(intensity)
+                key = ('B', method, self.base.FixInt(servers), intensity)
+                cached = self.CacheGet(key)
+                if cached is not None:
+                    return cached
+
+            B = erlang_core.ErlangB(self.Params(), servers, intensity, method)
+            if self.stats is not None and method != 'gamma':
+                self.stats.Iterations(max(self.base.FixInt(servers), 0))
+            if self.cache is not None:
+                self.CachePut(key, B)
+            return B
         except ValueError as ve:
             print (ve)
             return 0
@@ -130,6 +443,27 @@ class Erlang:
             print ('General error')
             return 0
 
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangBGamma (int, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       servers    = Number of telephone lines
+    #       intensity  = Arrival rate of calls / Completion rate of calls
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangB written as Poisson probability over Poisson distribution function,
+    #       B(n, A) = P(X = n) / P(X <= n)  with X ~ Poisson(A), and P(X <= n) = Q(n + 1, A),
+    #   where Q is the regularised upper incomplete gamma function. Q is evaluated with its power
+    #   series when A < n + 1 and with its continued fraction (modified Lentz) otherwise. Both
+    #   need O(sqrt(n)) terms at most, instead of the n steps of the recurrence, and are iterated
+    #   until the last term changes the result by less than the float resolution. The relative
+    #   error of the result stays below 1E-12 (compared against the recurrence up to 100,000
+    #   servers and 120,000 Erlangs).
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (float) - Probability in % of a call being blocked.
+    #   -------------------------------------------------------------------------------------------
+    def ErlangBGamma (self, servers, intensity):
+        return erlang_core.ErlangBGamma(self.Params(), servers, intensity)
+
     #   -------------------------------------------------------------------------------------------
     #   ErlangBExt (int, float, float)
     #   -------------------------------------------------------------------------------------------
@@ -199,16 +533,24 @@ class Erlang:
     #   Parameters:
     #   servers    = Number of telephone lines
     #   intensity  = Arrival rate of calls / Completion rate of calls
+    #   method     = evaluation method of ErlangB, 'recurrence' (default) or 'gamma'
     #   -------------------------------------------------------------------------------------------
     #   Returns (float) - Probability in % of a transaction being placed in a queue.
     #   -------------------------------------------------------------------------------------------
-    def ErlangC(self, agents, intensity):
+    def ErlangC(self, agents, intensity, method='recurrence'):
         try:
             if agents < 0 or intensity < 0:
                 raise ValueError(''.join(self.err_val_ltz))
-            B = self.ErlangB (agents, intensity)
-            C = B / (((intensity / agents) * B) + (1 - (intensity / agents)))
-            return self.base.MinMax(C,0,1)
+            if self.cache is not None:
+                intensity = self.CacheQuantize(intensity)
+                key = ('C', method, agents, intensity)
+                cached = self.CacheGet(key)
+                if cached is not None:
+                    return cached
+            C = erlang_core.ErlangC(self.Params(), agents, intensity, method, self.ErlangB)
+            if self.cache is not None:
+                self.CachePut(key, C)
+            return C
         except ValueError as ve:
             print (ve)
             return 0
@@ -216,30 +558,234 @@ class Erlang:
             print ('General error')
             return 0
 
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangB_batch (array, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       servers    = Array of numbers of telephone lines
+    #       intensity  = Array of arrival rates of calls / completion rates of calls
+    #   -------------------------------------------------------------------------------------------
+    #   Both arrays are broadcast against each other. The ErlangB recurrence is run for all pairs
+    #   in lockstep; pairs are sorted by server count so that each step only touches the pairs
+    #   which still need iterating. Negative entries return 0, as ErlangB does.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of float) - Probability in % of a call being blocked, for each pair.
+    #   -------------------------------------------------------------------------------------------
+    def ErlangB_batch (self, servers, intensity):
+        import numpy as np
+        servers, intensity = np.broadcast_arrays(np.asarray(servers, dtype=float),
+                                                 np.asarray(intensity, dtype=float))
+        shape = servers.shape
+        n = np.floor(servers.ravel())
+        A = intensity.ravel().copy()
+        if self.cache is not None:
+            # evaluate the intensities ErlangB evaluates, see EnableCache
+            A = self.CacheQuantize_batch(A)
+        invalid = (n < 0) | (A < 0)
+        if invalid.any():
+            print (self.err_val_ltz)
+            n[invalid] = 0
+        B = np.zeros(n.size)
+        if n.size == 0:
+            return B.reshape(shape)
+        # sort descending by server count - the active pairs are always a prefix
+        order = np.argsort(-n, kind='stable')
+        n_sorted = n[order]
+        A_sorted = A[order]
+        last = np.ones(n.size)
+        maxiterate = int(n_sorted[0])
+        # number of pairs with at least i servers, for i = 1 .. maxiterate
+        active = np.searchsorted(-n_sorted, -np.arange(1, maxiterate + 1), side='right')
+        for i in range(1, maxiterate + 1):
+            k = active[i - 1]
+            x = A_sorted[:k] * last[:k]
+            last[:k] = x / (i + x)
+        if self.stats is not None:
+            self.stats.Iterations(int(active.sum()))
+        B[order] = np.where(n_sorted > 0, last, 0.0)
+        return np.clip(B, 0, 1).reshape(shape)
+
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangC_batch (array, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   agents     = Array of numbers of agents
+    #   intensity  = Array of arrival rates of transactions / completion rates of transactions
+    #   -------------------------------------------------------------------------------------------
+    #   Vectorised form of ErlangC, see ErlangB_batch. Pairs for which ErlangC fails (no agents,
+    #   negative input) return 0.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of float) - Probability in % of a transaction being placed in a queue.
+    #   -------------------------------------------------------------------------------------------
+    def ErlangC_batch(self, agents, intensity):
+        import numpy as np
+        agents, intensity = np.broadcast_arrays(np.asarray(agents, dtype=float),
+                                                np.asarray(intensity, dtype=float))
+        if self.cache is not None:
+            # evaluate the intensities ErlangC evaluates, see EnableCache
+            intensity = self.CacheQuantize_batch(intensity)
+        B = self.ErlangB_batch(agents, intensity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rho = intensity / agents
+            denom = (rho * B) + (1 - rho)
+            C = B / denom
+        valid = (agents > 0) & (intensity >= 0) & (denom != 0) & np.isfinite(C)
+        return np.where(valid, np.clip(C, 0, 1), 0.0)
+
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangCStable (int, float, str)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   agents     = Number of agents
+    #   intensity  = Arrival rate of transactions / Completion rate of transactions
+    #   mode       = 'auto' (default) - float, unless 1/B overflows the float range, then decimal
+    #                'float' - float64 only
+    #                'decimal' - the recurrence in decimal arithmetic with ErlangCPrecision digits
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangC written as
+    #       1/C = A/n + ((n - A)/n) * (1/B),   1/B(k) = 1 + (k/A) * 1/B(k-1),   1/B(0) = 1
+    #   Unlike B / ((A/n)*B + 1 - A/n), no step subtracts two nearly equal numbers: n - A is
+    #   exact for A close to n, and the recurrence for 1/B only adds positive terms. The result
+    #   keeps its precision at any occupancy below 100% and for any number of agents, so 'auto'
+    #   stays on the float path. The one case float cannot represent is 1/B above the float
+    #   range (a tiny C of a queue far below its capacity), which 'auto' evaluates in decimal
+    #   arithmetic. An occupancy of 100% or more saturates the queue, C = 1.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (float, str) - the probability of a transaction being queued and the path taken:
+    #                          'float', 'decimal' or 'saturated'.
+    #   -------------------------------------------------------------------------------------------
+    def ErlangCStable(self, agents, intensity, mode='auto'):
+        try:
+            if agents < 0 or intensity < 0:
+                raise ValueError(''.join(self.err_val_ltz))
+            if mode not in self.ErlangCModes:
+                raise ValueError("mode must be one of " + ", ".join(self.ErlangCModes) + "!")
+            n = self.base.FixInt(agents)
+            A = float(intensity)
+            if n < 1 or A == 0:
+                return 0.0, 'float'
+            if A >= n:
+                return 1.0, 'saturated'
+            if mode == 'decimal':
+                return self.ErlangCDecimal(n, A), 'decimal'
+            inverse = 1.0
+            for k in range(1, n + 1):
+                inverse = 1.0 + inverse * (k / A)
+            if self.stats is not None:
+                self.stats.Iterations(n)
+            if mode == 'auto' and math.isinf(inverse):
+                return self.ErlangCDecimal(n, A), 'decimal'
+            # on 'float' an overflow of 1/B leaves C = 0
+            return self.base.MinMax(1 / (A / n + ((n - A) / n) * inverse), 0, 1), 'float'
+        except ValueError as ve:
+            print (ve)
+            return 0, 'error'
+
+    def ErlangCDecimal(self, agents, intensity):
+        import decimal
+        with decimal.localcontext() as context:
+            context.prec = self.ErlangCPrecision
+            n = decimal.Decimal(agents)
+            A = decimal.Decimal(intensity)
+            inverse = decimal.Decimal(1)
+            for k in range(1, agents + 1):
+                inverse = 1 + inverse * k / A
+            if self.stats is not None:
+                self.stats.Iterations(agents)
+            return float(1 / (A / n + (n - A) / n * inverse))
+
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangCStable_batch (array, array, str)
+    #   -------------------------------------------------------------------------------------------
+    #   Vectorised form of ErlangCStable. The float recurrence for 1/B runs for all pairs in
+    #   lockstep as in ErlangB_batch, pairs taking the decimal path (all of them on 'decimal',
+    #   those whose 1/B overflows on 'auto') are evaluated one at a time.
+    #   Invalid pairs (negative input) return 0 and 'error'.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of float, array of str) - C and the path taken for each pair.
+    #   -------------------------------------------------------------------------------------------
+    def ErlangCStable_batch(self, agents, intensity, mode='auto'):
+        import numpy as np
+        if mode not in self.ErlangCModes:
+            raise ValueError("mode must be one of " + ", ".join(self.ErlangCModes) + "!")
+        agents, intensity = np.broadcast_arrays(np.asarray(agents, dtype=float),
+                                                np.asarray(intensity, dtype=float))
+        shape = agents.shape
+        n = np.floor(agents.ravel())
+        A = intensity.ravel()
+        C = np.zeros(n.size)
+        path = np.full(n.size, 'float', dtype='<U9')
+        invalid = (n < 0) | (A < 0)
+        if invalid.any():
+            print (self.err_val_ltz)
+            path[invalid] = 'error'
+        saturated = ~invalid & (n >= 1) & (A >= n)
+        C[saturated] = 1.0
+        path[saturated] = 'saturated'
+        rows = ~invalid & (n >= 1) & (A > 0) & (A < n)
+        exact = rows & (mode == 'decimal')
+        rows = np.nonzero(rows & ~exact)[0]
+        if rows.size:
+            # sort descending by agents - the active pairs are always a prefix
+            order = rows[np.argsort(-n[rows], kind='stable')]
+            n_sorted = n[order]
+            A_sorted = A[order]
+            inverse = np.ones(order.size)
+            active = np.searchsorted(-n_sorted, -np.arange(1, int(n_sorted[0]) + 1), side='right')
+            with np.errstate(over='ignore'):
+                for k in range(1, int(n_sorted[0]) + 1):
+                    m = active[k - 1]
+                    inverse[:m] = 1.0 + inverse[:m] * (k / A_sorted[:m])
+                C[order] = np.clip(1 / (A_sorted / n_sorted + ((n_sorted - A_sorted) / n_sorted) * inverse), 0, 1)
+            if self.stats is not None:
+                self.stats.Iterations(int(active.sum()))
+            if mode == 'auto':
+                exact[order[np.isinf(inverse)]] = True
+        for i in np.nonzero(exact)[0]:
+            C[i] = self.ErlangCDecimal(int(n[i]), A[i].item())
+        path[exact] = 'decimal'
+        return C.reshape(shape), path.reshape(shape)
+
+    #   -------------------------------------------------------------------------------------------
+    #   ErlangCSeries (int, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   start      = Number of agents to start the series with
+    #   intensity  = Arrival rate of transactions / Completion rate of transactions
+    #   -------------------------------------------------------------------------------------------
+    #   Generator used by the staffing solvers. ErlangB is evaluated once for start agents, after
+    #   that the recurrence is extended by one step per agent added, instead of re-running ErlangC
+    #   from scratch for every agent count. The values are identical to calling ErlangC.
+    #   -------------------------------------------------------------------------------------------
+    #   Yields (int, float) - agents and the probability of a transaction being queued.
+    #   -------------------------------------------------------------------------------------------
+    def ErlangCSeries(self, start, intensity):
+        agents = self.base.FixInt(start)
+        if self.cache is not None:
+            intensity = self.CacheQuantize(intensity)
+        if intensity < 0:
+            # keep the error handling of ErlangC
+            while True:
+                yield agents, self.ErlangC(agents, intensity)
+                agents += 1
+        yield from erlang_core.ErlangCSeries(self.Params(), agents, intensity, self.ErlangB)
+
     #   -------------------------------------------------------------------------------------------
     #   NBTrunks (float, float)
     #   -------------------------------------------------------------------------------------------
     #   Parameters:
     #       intensity  = Busyhour traffic in Erlangs
     #       blocking  = blocking factor percentage e.g. 0.10  (10% of calls may receive busy tone)
+    #       method    = evaluation method of ErlangB, see TrunkSearch
     #   -------------------------------------------------------------------------------------------
     #   Returns (int) - The number of telephone lines required.
     #   -------------------------------------------------------------------------------------------
-    def NBTrunks(self, intensity, blocking):
+    def NBTrunks(self, intensity, blocking, method='recurrence'):
         try:
             if blocking < 0 or intensity < 0:
                 raise ValueError(''.join(self.err_val_ltz))
-            maxitrn = 65535
-            sngcnt  = 0
-            i       = self.base.IntCeiling(intensity)
-            B       = 0
-            while i < maxitrn:
-                sngcnt = i
-                B = self.ErlangB (sngcnt, intensity)
-                if B <= blocking:
-                    break
-                i += 1
-            if i == maxitrn:
+            i = self.TrunkSearch(self.base.IntCeiling(intensity), intensity, blocking, method)
+            if i == self.MaxTrunks:
                 i = 0
             return i
         except ValueError as ve:
@@ -255,24 +801,15 @@ class Erlang:
     #   Parameters:
     #       agents  = Number of Agents available
     #       intensity  = Arrival rate of calls / Completion rate of calls
+    #       method    = evaluation method of ErlangB, see TrunkSearch
     #   -------------------------------------------------------------------------------------------
     #   Returns (int) - The max number of telephone lines (Trunks) required.
     #   -------------------------------------------------------------------------------------------
-    def NumberTrunks(self, intensity, agents):
+    def NumberTrunks(self, intensity, agents, method='recurrence'):
         try:
             if agents < 0 or intensity < 0:
                 raise ValueError(''.join(self.err_val_ltz))
-            maxitrn = 65535
-            sngcnt  = 0
-            i       = self.base.IntCeiling(agents)
-            B       = 0
-            while i < maxitrn:
-                sngcnt = i
-                B = self.ErlangB (sngcnt, intensity)
-                if B <= 0.001:
-                    break
-                i += 1
-            return i
+            return self.TrunkSearch(self.base.IntCeiling(agents), intensity, 0.001, method)
         except ValueError as ve:
             print (ve)
             return 0
@@ -280,6 +817,66 @@ class Erlang:
             print ('General error')
             return 0
 
+    #   -------------------------------------------------------------------------------------------
+    #   TrunkSearch (int, float, float, str)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       start     = smallest number of trunks to consider
+    #       intensity = Busyhour traffic in Erlangs
+    #       blocking  = blocking factor percentage e.g. 0.10  (10% of calls may receive busy tone)
+    #       method    = 'recurrence' (default) - ErlangB is evaluated once for start trunks, then
+    #                   the recurrence is extended one trunk at a time until blocking is met, so
+    #                   the whole search costs as much as a single ErlangB call.
+    #                   'gamma' - ErlangB decreases with the number of trunks, so the first number
+    #                   of trunks meeting blocking is bracketed by doubling and then bisected,
+    #                   using the incomplete gamma evaluation of ErlangB. Ties with blocking may
+    #                   come out one trunk apart from the recurrence.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (int) - the first number of trunks from start whose blocking is not above blocking,
+    #                   MaxTrunks if there is none below MaxTrunks.
+    #   -------------------------------------------------------------------------------------------
+    def TrunkSearch(self, start, intensity, blocking, method='recurrence'):
+        if method not in self.ErlangBMethods:
+            raise ValueError("method must be one of " + ", ".join(self.ErlangBMethods) + "!")
+        i = start
+        if i >= self.MaxTrunks:
+            return i
+        if self.cache is not None:
+            intensity = self.CacheQuantize(intensity)
+        B = self.ErlangB(i, intensity, method)
+        if B <= blocking:
+            return i
+        if method == 'gamma':
+            # bracket: B(lo) > blocking >= B(hi)
+            lo   = i
+            step = max(1, i)
+            hi   = lo + step
+            while hi < self.MaxTrunks and self.ErlangB(hi, intensity, method) > blocking:
+                lo    = hi
+                step *= 2
+                hi    = lo + step
+            if hi >= self.MaxTrunks:
+                hi = self.MaxTrunks
+                if self.ErlangB(hi - 1, intensity, method) > blocking:
+                    return self.MaxTrunks
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self.ErlangB(mid, intensity, method) > blocking:
+                    lo = mid
+                else:
+                    hi = mid
+            return hi
+        last = B if i >= 1 else 1
+        while i < self.MaxTrunks:
+            if B <= blocking:
+                break
+            i += 1
+            B = (intensity * last) / (i + (intensity * last))
+            last = B
+        if self.stats is not None:
+            self.stats.Iterations(i - start)
+        return i
+
     #   -------------------------------------------------------------------------------------------
     #   NumberAgents (float, float)
     #   -------------------------------------------------------------------------------------------
@@ -300,6 +897,8 @@ class Erlang:
                 i += 1
                 B = (intensity * Last) / (i + (intensity * Last))
                 Last = B
+            if self.stats is not None:
+                self.stats.Iterations(i)
             return i
         except ValueError as ve:
             print (ve)
@@ -314,33 +913,142 @@ class Erlang:
     #   Parameters:
     #       servers  = Number of Trunks handling the traffic
     #       blocking  = blocking factor percentage e.g. 0.10  (10% of calls may receive busy tone)
+    #       method    = evaluation method of ErlangB, 'recurrence' (default) or 'gamma'
+    #       carried   = if True return the carried traffic intensity * (1 - blocking) instead of
+    #                   the offered traffic intensity
     #   -------------------------------------------------------------------------------------------
-    #   Returns (int) - The max number of telephone lines (Trunks) required.
+    #   Returns (float) - The traffic intensity in Erlangs the trunks can handle at the given
+    #                     blocking factor.
     #   -------------------------------------------------------------------------------------------
-    def Traffic(self, blocking, servers):
+    def Traffic(self, blocking, servers, method='recurrence', carried=False):
         Trunks = 0
         try:
             Trunks = self.base.FixInt(servers)
             if blocking < 0 or servers < 1:
                 raise ValueError(''.join(self.err_val_ltz))
-            # find a reasonable maximum number to work with
-            maxL = Trunks
-            B    = self.ErlangB(servers, maxL)
-            while B < blocking:
-                maxL *= 2
-                B = self.ErlangB(servers, maxL)
-            # find the increment to start with (multiple of 10)
-            incr = 1
-            while incr <= (maxL / 100):
-                incr *= 10
-            return LoopingTraffic(Trunks, blocking, incr, maxL, 0)
+            if blocking >= 1:
+                raise ValueError("blocking must be less than 1!")
+            if blocking == 0:
+                return 0
+            intensity = self.TrafficSolve(Trunks, blocking, method)
+            if carried:
+                return intensity * (1 - blocking)
+            return intensity
         except ValueError as ve:
             print (ve)
             return 0
         except:
             print ('General error')
             return 0
-    
+
+    #   -------------------------------------------------------------------------------------------
+    #   TrafficSolve (int, float, str)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       trunks    = number of Trunk lines (>= 1)
+    #       blocking  = blocking factor, 0 < blocking < 1
+    #       method    = evaluation method of ErlangB
+    #   -------------------------------------------------------------------------------------------
+    #   Solves ErlangB(trunks, A) = blocking for A with Newton's method on log(B) over log(A),
+    #   using the analytic derivative
+    #       d log(B) / d log(A) = trunks - A * (1 - B)
+    #   which is the number of trunks not carrying traffic and always positive. Steps leaving the
+    #   bracket of the root are replaced by a bisection step, so every iteration stays inside it.
+    #   Converges to full float precision in a handful of iterations.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (float) - the offered traffic intensity.
+    #   -------------------------------------------------------------------------------------------
+    def TrafficSolve(self, trunks, blocking, method='recurrence'):
+        target = math.log(blocking)
+        lo = 0.0
+        hi = math.inf
+        intensity = float(trunks)
+        loop = 0
+        while loop < self.MaxLoops:
+            B = self.ErlangB(trunks, intensity, method)
+            if B > blocking:
+                hi = intensity
+            else:
+                lo = intensity
+            if B > 0:
+                step = (math.log(B) - target) / (trunks - intensity * (1 - B))
+                new = intensity * math.exp(-max(min(step, 50), -50))
+            else:
+                new = intensity * 4
+            if not lo < new < hi:
+                if hi == math.inf:
+                    new = intensity * 4
+                elif lo == 0:
+                    new = intensity / 4
+                else:
+                    new = math.sqrt(lo * hi)
+            if self.stats is not None:
+                self.stats.Iterations(1)
+            if abs(new - intensity) <= 1E-13 * intensity:
+                return new
+            intensity = new
+            loop += 1
+        return intensity
+
+    #   -------------------------------------------------------------------------------------------
+    #   Traffic_batch (array, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       blocking  = Array of blocking factors
+    #       servers   = Array of numbers of Trunks handling the traffic
+    #       carried   = if True return the carried traffic instead of the offered traffic
+    #   -------------------------------------------------------------------------------------------
+    #   Vectorised form of Traffic, the Newton iterations of TrafficSolve run for all pairs in
+    #   lockstep using ErlangB_batch. Invalid pairs return 0, as Traffic does.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of float) - the traffic intensity in Erlangs for each pair.
+    #   -------------------------------------------------------------------------------------------
+    def Traffic_batch(self, blocking, servers, carried=False):
+        import numpy as np
+        blocking, servers = np.broadcast_arrays(np.asarray(blocking, dtype=float),
+                                                np.asarray(servers, dtype=float))
+        shape = blocking.shape
+        b = blocking.ravel()
+        n = np.floor(servers.ravel())
+        result = np.zeros(b.size)
+        valid = (n >= 1) & (b > 0) & (b < 1)
+        if (~valid & ((n < 1) | (b < 0) | (b >= 1))).any():
+            print (self.err_val_ltz)
+        if not valid.any():
+            return result.reshape(shape)
+        b = b[valid]
+        n = n[valid]
+        target = np.log(b)
+        lo = np.zeros(b.size)
+        hi = np.full(b.size, np.inf)
+        intensity = n.copy()
+        todo = np.ones(b.size, dtype=bool)
+        loop = 0
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            while todo.any() and loop < self.MaxLoops:
+                idx = np.nonzero(todo)[0]
+                A = intensity[idx]
+                B = self.ErlangB_batch(n[idx], A)
+                above = B > b[idx]
+                hi[idx] = np.where(above, A, hi[idx])
+                lo[idx] = np.where(above, lo[idx], A)
+                step = (np.log(B) - target[idx]) / (n[idx] - A * (1 - B))
+                new = np.where(B > 0, A * np.exp(-np.clip(step, -50, 50)), A * 4)
+                outside = ~((lo[idx] < new) & (new < hi[idx]))
+                fallback = np.where(np.isinf(hi[idx]), A * 4,
+                                    np.where(lo[idx] == 0, A / 4, np.sqrt(lo[idx] * hi[idx])))
+                new = np.where(outside | ~np.isfinite(new), fallback, new)
+                done = np.abs(new - A) <= 1E-13 * A
+                intensity[idx] = new
+                todo[idx[done]] = False
+                loop += 1
+                if self.stats is not None:
+                    self.stats.Iterations(idx.size)
+        if carried:
+            intensity = intensity * (1 - b)
+        result[valid] = intensity
+        return result.reshape(shape)
+
     #   -------------------------------------------------------------------------------------------
     #   LoopingTraffic (int, float, int, float)
     #   -------------------------------------------------------------------------------------------
@@ -363,7 +1071,7 @@ class Erlang:
             loop      = 0
             # large numbers for trunks caused locking as precision of variable intensity is reduced
             # with very high values added MaxLoop as protection
-            while incr >= MaxAccuracy and loop < MaxLoops:
+            while incr >= self.MaxAccuracy and loop < self.MaxLoops:
                 B = self.ErlangB(trunks, intensity)
                 if B > blocking:
                     incr = incr / 10
@@ -398,15 +1106,7 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def Abandon (self, agents, transactions):
         try:
-            # Calculate traffic rate
-            trafficrate = transactions / self.deathrate
-            utilisation = trafficrate / agents
-            if utilisation >= 1:
-                utilisation = 0.99
-            C = self.ErlangC(agents, trafficrate)
-            # take all queueing calls (C) and subtract calls queueing within abandontime
-            A = C * math.exp((trafficrate - agents)*(self.abnt/self.aht))
-            return self.base.MinMax(A,0,1)
+            return erlang_core.Abandon(self.Params(), agents, transactions, self.ErlangC)
         except:
             return 0
 
@@ -425,52 +1125,82 @@ class Erlang:
     #   Returns (float) - Percentage of calls abandoned within interval
     #   -------------------------------------------------------------------------------------------
     def Agents (self, service_time, transactions):
+        return self.AgentsErlangC(service_time, transactions)[0]
+
+    #   -------------------------------------------------------------------------------------------
+    #   AgentsErlangC (int, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Same as Agents, but also returns the ErlangC value for the number of agents found, so that
+    #   callers deriving further KPIs do not have to evaluate ErlangC again.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (int, float) - number of agents required and probability of a transaction being
+    #                          placed in a queue with that number of agents.
+    #   -------------------------------------------------------------------------------------------
+    def AgentsErlangC (self, service_time, transactions):
         try:
-            no_agents    = 0
-            server       = 0
-            if self.sla > 1:
-                self.sla = 1
-            # calculate the traffic intensity
-            trafficrate = transactions / self.deathrate
-            # calculate the number of Erlangs / interval
-            Erlangs = self.base.FixInt((transactions * (self.aht)) / self.interval + 0.5)
-            # start at number of agents for 100% utilisation
-            if Erlangs < 1:
-                no_agents = 1
-            else:
-                no_agents = int(Erlangs//1)
-            utilisation = trafficrate / no_agents
-            # taking a realistic approach for Utilisation less than 100%
-            while utilisation >= 1:
-                no_agents = no_agents + 1
-                utilisation = trafficrate / no_agents
-            
-            maxiterate = no_agents * 100
-            # try each number of agents until the correct SLA is reached
-            i = 1
-            while i < maxiterate:
-                utilisation = trafficrate / no_agents
-                if utilisation < 1:
-                    server = no_agents
-                    C = self.ErlangC(server, trafficrate)
-                    # find the level of SLA with this number of agents
-                    SLQueued = 1 - C * math.exp((trafficrate - server) * service_time / self.aht)
-                    if SLQueued < 0:
-                        SLQueued = 0
-                    # put a limit on the accuracy required (it will never actually get to 100%)
-                    if SLQueued >= self.sla:
-                        i = maxiterate
-                    if  SLQueued > (1 - self.MaxAccuracy):
-                        i = maxiterate
-                # end if
-                if i != maxiterate:
-                    no_agents += 1
-                i += 1
-            return no_agents
+            params = self.Params()
+            no_agents, C = erlang_core.AgentsErlangC(params, service_time, transactions, self.MaxAccuracy,
+                                                     self.ErlangCSeries)
+            if self.stats is not None:
+                self.stats.Iterations(no_agents - erlang_core.StartAgents(params, transactions) + 1)
+            return no_agents, C
         except:
-            return 0
-        #   Agents
-    
+            return 0, 0
+        #   AgentsErlangC
+
+    #   -------------------------------------------------------------------------------------------
+    #   AgentsErlangC_batch (int, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       service_time = target answer time in seconds e.g. 15
+    #       transactions = array of the number of transactions received in the interval
+    #   -------------------------------------------------------------------------------------------
+    #   Vectorised form of AgentsErlangC. All volumes start at the same number of agents as
+    #   AgentsErlangC and the ErlangB recurrence is extended by one agent per step for all volumes
+    #   in lockstep, only for the volumes that have not met the SLA yet. Negative volumes are
+    #   passed to AgentsErlangC.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of int, array of float) - the number of agents required and the ErlangC
+    #                                            value for that number of agents, per volume.
+    #   -------------------------------------------------------------------------------------------
+    def AgentsErlangC_batch(self, service_time, transactions):
+        import numpy as np
+        transactions = np.asarray(transactions, dtype=float)
+        shape = transactions.shape
+        lam = transactions.ravel()
+        agents = np.zeros(lam.size, dtype=int)
+        C = np.zeros(lam.size)
+        for i in np.nonzero(lam < 0)[0]:
+            agents[i], C[i] = self.AgentsErlangC(service_time, lam[i].item())
+        rows = np.nonzero(lam >= 0)[0]
+        if rows.size:
+            A = lam[rows] / self.deathrate
+            # as ErlangCSeries, C is evaluated on the rounded intensity, see EnableCache
+            Q = self.CacheQuantize_batch(A) if self.cache is not None else A
+            # start at the number of agents for 100% utilisation, below 100% utilisation
+            start = np.maximum(np.floor(lam[rows] * self.aht / self.interval + 0.5), 1)
+            start = np.where(A / start >= 1, np.floor(A) + 1, start)
+            last = start + start * 100 - 1
+            n = start.copy()
+            B = self.ErlangB_batch(n, Q)
+            active = np.arange(rows.size)
+            while active.size:
+                a, q, b, m = A[active], Q[active], B[active], n[active]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    c = np.clip(b / (((q / m) * b) + (1 - (q / m))), 0, 1)
+                c = np.where(np.isfinite(c), c, 0.0)
+                sl = np.maximum(1 - c * np.exp((a - m) * service_time / self.aht), 0)
+                done = (sl >= self.sla) | (sl > (1 - self.MaxAccuracy)) | (m >= last[active])
+                agents[rows[active[done]]] = m[done]
+                C[rows[active[done]]] = c[done]
+                if self.stats is not None:
+                    self.stats.Iterations(int(done.size))
+                active = active[~done]
+                x = Q[active] * B[active]
+                n[active] += 1
+                B[active] = x / (n[active] + x)
+        return agents.reshape(shape), C.reshape(shape)
+
     #   -------------------------------------------------------------------------------------------
     #   AgentASA (int, int)
     #   -------------------------------------------------------------------------------------------
@@ -481,39 +1211,11 @@ class Erlang:
     #   Returns (int) - Number of agents required per interval to meet ASA
     #   -------------------------------------------------------------------------------------------
     def AgentASA (self, asa, transactions):
-        no_agents = 0
-        server    = 0
         try:
-            if asa < 0:
-                self.asa = 1
-            # calculate the traffic intensity
-            trafficrate = transactions/self.deathrate
-            # calculate the number of Erlangs/Interval
-            erlangs = self.base.FixInt((transactions * self.aht) / self.interval + 0.5)
-            # start calculation with 100% agent utilisation
-            if erlangs < 1:
-                no_agents = 1
-            else:
-                no_agents = int(erlangs//1)
-            utilisation = trafficrate / no_agents
-            # start calculation with < 100% agent utilisation
-            while utilisation >= 1:
-                no_agents += 1
-                utilisation = trafficrate / no_agents
-            maxiterate = no_agents * 100
-            # try each number of agents until the correct ASA is reached
-            i = 1
-            while i < maxiterate:
-                server = no_agents
-                utilisation = trafficrate / no_agents
-                C = self.ErlangC(server, trafficrate)
-                answertime = C / (server * self.deathrate * (1 - utilisation))
-                if (answertime * self.interval) < self.asa:
-                    break
-                else:
-                    i += 1
-                    no_agents += 1
-            # end while
+            params = self.Params()
+            no_agents = erlang_core.AgentASA(params, asa, transactions, self.ErlangCSeries)
+            if self.stats is not None:
+                self.stats.Iterations(no_agents - erlang_core.StartAgents(params, transactions) + 1)
             return no_agents
         except:
             return 0
@@ -528,14 +1230,7 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def ASA (self, agents, transactions):
         try:
-            # calculate the traffic intensity
-            trafficrate = transactions/self.deathrate
-            utilisation = trafficrate / agents
-            if utilisation >= 1:
-                utilisation = 0.99
-            C = self.ErlangC(agents, trafficrate)
-            at = C / (agents * self.deathrate * (1 - utilisation))
-            return self.base.hours_to_secs(at)
+            return erlang_core.ASA(self.Params(), agents, transactions, self.ErlangC)
         except:
             return 0
 
@@ -559,16 +1254,59 @@ class Erlang:
             xNoAgent = self.base.FixInt (agents)
             # Maximum number of calls at 100% utilisation
             calls = self.base.IntCeiling(self.interval / self.aht) * xNoAgent
-            xAgent = self.Agents (service_time, calls)
-            # Now count down call load until the current level of agents is met
-            while xAgent > xNoAgent and calls > 0:
-                calls -= 1
-                xAgent = self.Agents(service_time, calls)
-            #end while
-            return calls
+            # Now find the largest call load the current level of agents meets
+            return self.CapacitySearch(calls, xNoAgent, lambda x: self.Agents(service_time, x))
         except:
             return 0
 
+    #   -------------------------------------------------------------------------------------------
+    #   CallCapacity_batch (array, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       agents       = array of numbers of agents available
+    #       service_time = target answer time in seconds e.g. 15
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of int) - CallCapacity for each number of agents. Every distinct number of
+    #                            agents is only solved once.
+    #   -------------------------------------------------------------------------------------------
+    def CallCapacity_batch(self, agents, service_time):
+        import numpy as np
+        agents = np.asarray(agents)
+        values, inverse = np.unique(agents, return_inverse=True)
+        calls = np.array([self.CallCapacity(value.item(), service_time) for value in values], dtype=int)
+        return calls[inverse].reshape(agents.shape)
+
+    #   -------------------------------------------------------------------------------------------
+    #   CapacitySearch (int, float, function)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       calls = largest call load to consider
+    #       limit = number of agents available
+    #       solve = function returning the number of agents required for a call load
+    #   -------------------------------------------------------------------------------------------
+    #   The agents required never decrease when the call load grows, so instead of counting the
+    #   call load down one call at a time, the largest call load within limit is bisected. This
+    #   needs log2(calls) solves instead of up to calls solves and gives the same result.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (int) - the largest call load up to calls for which solve is within limit, 0 if
+    #                   there is none (calls itself if it is not larger than 0).
+    #   -------------------------------------------------------------------------------------------
+    def CapacitySearch(self, calls, limit, solve):
+        if calls <= 0 or solve(calls) <= limit:
+            return calls
+        # solve(lo) is within limit (or lo is 0), solve(hi) is not
+        lo = 0
+        hi = calls
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if solve(mid) <= limit:
+                lo = mid
+            else:
+                hi = mid
+            if self.stats is not None:
+                self.stats.Iterations(1)
+        return lo
+
     #   -------------------------------------------------------------------------------------------
     #   FractionalAgents (int, int)
     #   -------------------------------------------------------------------------------------------
@@ -586,62 +1324,12 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def FractionalAgents(self, service_time, transactions):
         try:
-            no_agents   = 0
-            utilisation = 0
-
-            if self.sla > 1:
-                sla = 1
-            else:
-                sla = self.sla
-
-            # calculate the traffic intensity
-            trafficrate = transactions / self.deathrate
-            # calculate the number of Erlangs/interval
-            erlangs = self.base.FixInt((transactions * self.aht) / self.interval + 0.5)
-            # start at number of agents for 100% utilisation
-            if erlangs < 1:
-                no_agents = 1
-            else:
-                no_agents = int(erlangs//1)
-                utilisation = trafficrate / no_agents
-            # reduce utilisation below 100%
-            while utilisation >= 1:
-                no_agents += 1
-                utilisation = trafficrate / no_agents
-            # end while
-            sl_queued   = 0
-            last_slq    = 0
-            servers     = 0
-            max_iterate = no_agents * 100
-            # try each number of agents until the correct SLA is reached
-            i = 1
-            while i < max_iterate:
-                last_slq = sl_queued
-                utilisation = trafficrate / no_agents
-                if utilisation < 1:
-                    servers = no_agents
-                    C = self.ErlangC(servers, trafficrate)
-                    # find the level of SLA with this number of agents
-                    sl_queued = 1 - C * math.exp((trafficrate - servers) * service_time / self.aht)
-                    if sl_queued < 0:
-                        sl_queued = 0
-                    if sl_queued > 1:
-                        sl_queued = 1
-                    # put a limit on the accuracy required (it will never actually get to 100%)
-                    if sl_queued >= sla or sl_queued > (1 - self.MaxAccuracy):
-                        i = max_iterate
-                # end if
-                if i != max_iterate:
-                    no_agents += 1
-            # end while
-            no_agents_sng = no_agents
-            # do we need to calculate a fraction?
-            if sl_queued > sla:
-                one_agent = sl_queued - last_slq
-                fract = sla - last_slq
-                no_agents_sng = (fract / one_agent) + (no_agents - 1)
-            # end if
-            return no_agents_sng
+            params = self.Params()
+            no_agents = erlang_core.FractionalAgents(params, service_time, transactions, self.MaxAccuracy,
+                                                     self.ErlangCSeries)
+            if self.stats is not None:
+                self.stats.Iterations(math.ceil(no_agents) - erlang_core.StartAgents(params, transactions) + 1)
+            return no_agents
         except:
             return 0
 
@@ -665,15 +1353,28 @@ class Erlang:
             xNoAgent = float (agents)
             # Maximum number of calls at 100% utilisation
             calls = self.base.IntCeiling (self.interval / self.aht * xNoAgent)
-            xagent = self.FractionalAgents (service_time, calls)
-            # Now count down call load until the current level of agents is met
-            while (xagent > xNoAgent and calls > 0):
-                calls -= 1
-                xagent = self.FractionalAgents (service_time, calls)
-            return calls
+            # Now find the largest call load the current level of agents meets
+            return self.CapacitySearch(calls, xNoAgent, lambda x: self.FractionalAgents(service_time, x))
         except:
             return 0
 
+    #   -------------------------------------------------------------------------------------------
+    #   FractionalCallCapacity_batch (int, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       service_time = target answer time in seconds e.g. 15
+    #       agents       = array of numbers of agents available
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array of int) - FractionalCallCapacity for each number of agents. Every distinct
+    #                            number of agents is only solved once.
+    #   -------------------------------------------------------------------------------------------
+    def FractionalCallCapacity_batch(self, service_time, agents):
+        import numpy as np
+        agents = np.asarray(agents)
+        values, inverse = np.unique(agents, return_inverse=True)
+        calls = np.array([self.FractionalCallCapacity(service_time, value.item()) for value in values], dtype=int)
+        return calls[inverse].reshape(agents.shape)
+
     #   -------------------------------------------------------------------------------------------
     #   Queued (int, int)
     #   -------------------------------------------------------------------------------------------
@@ -689,9 +1390,7 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def Queued(self, agents, transactions):
         try:
-            # Calculate traffic intensity
-            trafficrate = transactions / self.deathrate
-            return self.base.MinMax(self.ErlangC(agents, trafficrate), 0, 1)
+            return erlang_core.Queued(self.Params(), agents, transactions, self.ErlangC)
         except:
             return 0
 
@@ -710,14 +1409,7 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def QueueSize(self, agents, transactions):
         try:
-            # Calculate traffic intensity
-            trafficrate = transactions / self.deathrate
-            utilisation = trafficrate / agents
-            if utilisation >= 1:
-                utilisation = 0.99
-            C = self.ErlangC(agents, trafficrate)            
-            qsize = (utilisation * C) / (1 - utilisation)
-            return self.base.FixInt(qsize + 0.5)
+            return erlang_core.QueueSize(self.Params(), agents, transactions, self.ErlangC)
         except:
             return 0
 
@@ -736,14 +1428,7 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def QueueTime(self, agents, transactions):
         try:
-            # Calculate traffic intensity
-            trafficrate = transactions / self.deathrate
-            utilisation = trafficrate / agents
-            if utilisation >= 1:
-                utilisation = 0.99
-            # calculate average in the queue time for queued calls
-            qtime = 1 / (agents * self.deathrate * ( 1 - utilisation))
-            return self.base.hours_to_secs(qtime)
+            return erlang_core.QueueTime(self.Params(), agents, transactions)
         except:
             return 0
 
@@ -765,18 +1450,20 @@ class Erlang:
     def ServiceTime(self, agents, transactions):
         try:
             adjust = 0
+            # as Agents, a target above 100% counts as 100%
+            sla = min(self.sla, 1)
             # Calculate traffic intensity
             trafficrate = transactions / self.deathrate
             C = self.ErlangC(agents, trafficrate)
             # none will be queued so return 0 seconds
-            if C < (1 - self.sla):
+            if C < (1 - sla):
                 return 0
             utilisation = trafficrate / agents
             if utilisation >= 1:
                 utilisation = 0.99
             # calculate average in the queue time for queued calls
-            qtime = 1 / (agents * self.deathrate * ( 1 - utilisation)) * interval
-            stime = qtime * (1 -((1 - self.sla) / C))
+            qtime = 1 / (agents * self.deathrate * ( 1 - utilisation)) * self.interval
+            stime = qtime * (1 -((1 - sla) / C))
             ag = self.Agents(self.base.FixInt(stime),transactions)
             if ag != agents:
                 adjust = 1
@@ -800,17 +1487,7 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def SLA(self, agents, transactions, service_time):
         try:
-            # Calculate traffic intensity
-            trafficrate = transactions / self.deathrate
-            utilisation = trafficrate / agents
-            if utilisation >= 1:
-                utilisation = 0.99
-            # calculate average in the queue time for queued calls
-            C = self.ErlangC(agents, trafficrate) 
-            # now calculate SLA % as those not queuing plus those queuing
-            # revised formula with thanks to Tim Bolte and Jørn Lodahl for their input
-            SLQueued = 1 - C * math.exp((trafficrate - agents) * service_time / self.aht)        
-            return self.base.MinMax(SLQueued, 0, 1)
+            return erlang_core.SLA(self.Params(), agents, transactions, service_time, self.ErlangC)
         except:
             return 0
 
@@ -840,7 +1517,7 @@ class Erlang:
             answer_time = C / (agents * self.deathrate * (1 - utilisation))
             # now calculate new intensity using average life time of call 
             # (queuing time + handle time)
-            R = transactions / (self.interval / (self.aht + self.base.hours_to_secs(answer_time)))
+            R = transactions / (self.interval / (self.aht + self.base.intervals_to_secs(answer_time, self.interval)))
             no_trunks = self.NumberTrunks(R, agents)
             # if there is traffic (Trafficrate>0) then always return at least 1 trunk
             if no_trunks < 1 and trafficrate > 0:
@@ -864,8 +1541,108 @@ class Erlang:
     #   -------------------------------------------------------------------------------------------
     def Utilisation(self, agents, transactions):
         try:
-            # Calculate traffic intensity
-            trafficrate = transactions / self.deathrate
-            return self.base.MinMax(trafficrate / agents, 0, 1)
+            return erlang_core.Utilisation(self.Params(), agents, transactions)
         except:
             return 0
+
+    ###############################################
+    ### Interval Planning Related Functions     ###
+    ###############################################
+
+    #   -------------------------------------------------------------------------------------------
+    #   plan (list, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       intervals    = sequence of (label, transactions) rows, e.g. [["08:00", 100], ...]
+    #       service_time = target answer time in seconds e.g. 15
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters provided in Class Constructor:
+    #       sla      = % of calls to be answered within the ServiceTime period  e.g. 0.95 (95%).
+    #       aht      = the average handle time.
+    #       abnt     = time in seconds before the caller will abandon.
+    #       interval = the forecasting interval 15, 30, 45, 60 minutes.
+    #   -------------------------------------------------------------------------------------------
+    #   Staffs every interval and derives Utilisation, SLA, ASA, Abandon, Queued, QueueTime and
+    #   QueueSize from the ErlangC value found while solving for the agents, instead of calling
+    #   each KPI method (and with it ErlangC) separately. The values are the same as the ones
+    #   returned by the individual methods.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict of arrays) - columns label, transactions, agents, utilisation, sla, asa,
+    #                              abandon, queued, queue_time and queue_size, one row per interval.
+    #   -------------------------------------------------------------------------------------------
+    def plan(self, intervals, service_time):
+        import numpy as np
+        columns = ('label', 'transactions', 'agents', 'utilisation', 'sla', 'asa',
+                   'abandon', 'queued', 'queue_time', 'queue_size')
+        rows = {name: [] for name in columns}
+        for label, transactions in intervals:
+            rows['label'].append(label)
+            rows['transactions'].append(transactions)
+            agents, C = self.AgentsErlangC(service_time, transactions)
+            kpi = self.IntervalKPI(agents, transactions, service_time, C)
+            rows['agents'].append(agents)
+            for name in columns[3:]:
+                rows[name].append(kpi[name])
+        result = {name: np.asarray(rows[name]) for name in columns}
+        result['agents']     = result['agents'].astype(int)
+        result['asa']        = result['asa'].astype(int)
+        result['queue_time'] = result['queue_time'].astype(int)
+        result['queue_size'] = result['queue_size'].astype(int)
+        for name in ('transactions', 'utilisation', 'sla', 'abandon', 'queued'):
+            result[name] = result[name].astype(float)
+        return result
+
+    #   -------------------------------------------------------------------------------------------
+    #   IntervalKPI (int, int, int, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       agents       = number of agents available
+    #       transactions = the number of transactions received in the given interval period
+    #       service_time = target answer time in seconds e.g. 15
+    #       C            = ErlangC for agents and the traffic intensity of transactions
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - utilisation, sla, asa, abandon, queued, queue_time and queue_size, using
+    #                    the same formulas as the individual KPI methods.
+    #   -------------------------------------------------------------------------------------------
+    def IntervalKPI(self, agents, transactions, service_time, C):
+        try:
+            return erlang_core.IntervalKPI(self.Params(), agents, transactions, service_time, C)
+        except:
+            return {'utilisation': 0, 'sla': 0, 'asa': 0, 'abandon': 0,
+                    'queued': 0, 'queue_time': 0, 'queue_size': 0}
+
+    #   -------------------------------------------------------------------------------------------
+    #   IntervalKPI_batch (array, array, int, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Vectorised form of IntervalKPI, e.g. for the result of AgentsErlangC_batch. The values
+    #   agree with IntervalKPI to the rounding of the exponential. Volumes without agents get 0
+    #   for every KPI and sla and abandon are 0 where the exponential overflows, as in IntervalKPI.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict of arrays) - utilisation, sla, asa, abandon, queued, queue_time and
+    #                              queue_size, with asa, queue_time and queue_size as int.
+    #   -------------------------------------------------------------------------------------------
+    def IntervalKPI_batch(self, agents, transactions, service_time, C):
+        import numpy as np
+        agents, transactions, C = np.broadcast_arrays(np.asarray(agents, dtype=float),
+                                                      np.asarray(transactions, dtype=float),
+                                                      np.asarray(C, dtype=float))
+        valid = agents > 0
+        n = np.where(valid, agents, 1)
+        trafficrate = transactions / self.deathrate
+        utilisation = trafficrate / n
+        capped = np.where(utilisation >= 1, 0.99, utilisation)
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            asa = np.floor(C / (n * self.deathrate * (1 - capped)) * self.interval + 0.5)
+            queue_time = np.floor(1 / (n * self.deathrate * (1 - capped)) * self.interval + 0.5)
+            queue_size = np.floor((capped * C) / (1 - capped) + 0.5)
+            grow_sla = np.exp((trafficrate - n) * service_time / self.aht)
+            grow_abandon = np.exp((trafficrate - n) * (self.abnt / self.aht))
+            sla = np.where(np.isfinite(grow_sla), np.clip(1 - C * grow_sla, 0, 1), 0.0)
+            abandon = np.where(np.isfinite(grow_sla) & np.isfinite(grow_abandon),
+                               np.clip(C * grow_abandon, 0, 1), 0.0)
+        kpi = {'utilisation': np.clip(utilisation, 0, 1), 'sla': sla, 'asa': asa, 'abandon': abandon,
+               'queued': np.clip(C, 0, 1), 'queue_time': queue_time, 'queue_size': queue_size}
+        for name, value in kpi.items():
+            value = np.where(valid, value, 0)
+            kpi[name] = value.astype(int) if name in ('asa', 'queue_time', 'queue_size') else value.astype(float)
+        return kpi
@@ -0,0 +1,377 @@
+# Erlang Library for contact center operations forecasting
+# Stateless calculator core - pure functions over ErlangParams
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import math
+from collections import namedtuple
+from erlang_base import Erlang_Base
+
+#   -------------------------------------------------------------------------------------------
+#   The functions of this module only read their arguments: the parameters are an immutable
+#   erlang_c.ErlangParams record (Erlang.Params returns the one of an Erlang object) and nothing
+#   is cached or counted, so they can be called concurrently from a thread pool. Invalid input
+#   raises ValueError, failing arithmetic (no agents, overflowing exponentials) raises the
+#   ArithmeticError of the formula. Evaluate turns either into a Result instead.
+#
+#   Erlang wraps these functions and keeps its own conventions on top: the optional result cache
+#   and statistics, and printing the error and returning 0. The hooks erlangb, erlangc and series
+#   replace the ErlangB, ErlangC and ErlangCSeries evaluations, which is how Erlang routes them
+#   through its cache.
+#   -------------------------------------------------------------------------------------------
+base           = Erlang_Base
+ErrValLtz      = 'Value error - parameter cannot be less than 0'
+ErlangBMethods = ('recurrence', 'gamma')
+MaxAccuracy    = 1E-05
+# functions that can be called through Evaluate, all take the parameters first
+Functions = ('ErlangB', 'ErlangBGamma', 'ErlangC', 'Agents', 'AgentsErlangC', 'AgentASA',
+             'FractionalAgents', 'StartAgents', 'Abandon', 'ASA', 'Queued', 'QueueSize', 'QueueTime',
+             'SLA', 'Utilisation', 'IntervalKPI')
+
+# value is None when error (the exception raised) is set
+Result = namedtuple('Result', ('value', 'error'))
+
+#   -------------------------------------------------------------------------------------------
+#   Evaluate (ErlangParams, str, ...)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       params = parameters of the queue
+#       name   = one of Functions e.g. 'Agents'
+#       args   = arguments of the function after params
+#   -------------------------------------------------------------------------------------------
+#   Returns (Result) - the value of the function, or the error it raised.
+#   -------------------------------------------------------------------------------------------
+def Evaluate(params, name, *args):
+    if name not in Functions:
+        return Result(None, ValueError("name must be one of " + ", ".join(Functions) + "!"))
+    try:
+        return Result(globals()[name](params, *args), None)
+    except Exception as e:
+        return Result(None, e)
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangB (ErlangParams, int, float, str)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       servers   = Number of telephone lines
+#       intensity = Arrival rate of calls / Completion rate of calls
+#       method    = 'recurrence' (default) or 'gamma', see Erlang.ErlangB
+#   -------------------------------------------------------------------------------------------
+#   Returns (float) - Probability in % of a call being blocked.
+#   -------------------------------------------------------------------------------------------
+def ErlangB(params, servers, intensity, method='recurrence'):
+    if servers < 0 or intensity < 0:
+        raise ValueError(ErrValLtz)
+    if method not in ErlangBMethods:
+        raise ValueError("method must be one of " + ", ".join(ErlangBMethods) + "!")
+    if method == 'gamma':
+        return base.MinMax(ErlangBGamma(params, servers, intensity), 0, 1)
+    B = 0.0
+    last = 1
+    for i in range(1, base.FixInt(servers) + 1):
+        B = (intensity * last) / (i + (intensity * last))
+        last = B
+    return base.MinMax(B, 0, 1)
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangBGamma (ErlangParams, int, float)
+#   -------------------------------------------------------------------------------------------
+#   ErlangB through the incomplete gamma function, see Erlang.ErlangBGamma.
+#   -------------------------------------------------------------------------------------------
+#   Returns (float) - Probability in % of a call being blocked.
+#   -------------------------------------------------------------------------------------------
+def ErlangBGamma(params, servers, intensity):
+    n = base.FixInt(servers)
+    x = float(intensity)
+    # same conventions as the recurrence
+    if n < 1 or x == 0:
+        return 0.0
+    eps   = 1E-16
+    fpmin = 1E-300
+    a     = n + 1
+    if x < a:
+        # Q(a, x) = 1 - P(X = a) * (1 + x/(a+1) + x^2/((a+1)(a+2)) + ...)
+        term  = 1.0
+        total = 1.0
+        k     = 1
+        while term > total * eps:
+            term  *= x / (a + k)
+            total += term
+            k += 1
+        Q = 1 - base.PoissonPmf(a, x) * total
+        return base.PoissonPmf(n, x) / Q
+    # Q(a, x) = P(X = n) * x * h with h the continued fraction 1/(x+1-a- 1*(1-a)/(x+3-a- ...))
+    b = x + 1 - a
+    c = 1 / fpmin
+    d = 1 / b
+    h = d
+    i = 1
+    while True:
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        if abs(d) < fpmin:
+            d = fpmin
+        c = b + an / c
+        if abs(c) < fpmin:
+            c = fpmin
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < eps:
+            break
+        i += 1
+    return 1 / (x * h)
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangC (ErlangParams, int, float, str, function)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       agents    = Number of agents
+#       intensity = Arrival rate of transactions / Completion rate of transactions
+#       method    = evaluation method of ErlangB
+#       erlangb   = optional function (servers, intensity, method) used instead of ErlangB
+#   -------------------------------------------------------------------------------------------
+#   Returns (float) - Probability in % of a transaction being placed in a queue.
+#   -------------------------------------------------------------------------------------------
+def ErlangC(params, agents, intensity, method='recurrence', erlangb=None):
+    if agents < 0 or intensity < 0:
+        raise ValueError(ErrValLtz)
+    if erlangb is None:
+        B = ErlangB(params, agents, intensity, method)
+    else:
+        B = erlangb(agents, intensity, method)
+    return base.MinMax(B / (((intensity / agents) * B) + (1 - (intensity / agents))), 0, 1)
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangCSeries (ErlangParams, int, float, function)
+#   -------------------------------------------------------------------------------------------
+#   Generator used by the staffing solvers: ErlangB is evaluated once for start agents (with
+#   erlangb if given), then the recurrence is extended by one step per agent added.
+#   -------------------------------------------------------------------------------------------
+#   Yields (int, float) - agents and the probability of a transaction being queued.
+#   -------------------------------------------------------------------------------------------
+def ErlangCSeries(params, start, intensity, erlangb=None):
+    agents = base.FixInt(start)
+    if intensity < 0:
+        raise ValueError(ErrValLtz)
+    B = ErlangB(params, agents, intensity) if erlangb is None else erlangb(agents, intensity)
+    last = B if agents >= 1 else 1
+    while True:
+        try:
+            C = base.MinMax(B / (((intensity / agents) * B) + (1 - (intensity / agents))), 0, 1)
+        except ZeroDivisionError:
+            C = 0
+        yield agents, C
+        agents += 1
+        B = (intensity * last) / (agents + (intensity * last))
+        last = B
+
+#   -------------------------------------------------------------------------------------------
+#   StartAgents (ErlangParams, int)
+#   -------------------------------------------------------------------------------------------
+#   Returns (int) - the number of agents the staffing solvers start at: the agents for 100%
+#                   utilisation, raised until the utilisation is below 100%.
+#   -------------------------------------------------------------------------------------------
+def StartAgents(params, transactions):
+    trafficrate = transactions / params.deathrate
+    erlangs = base.FixInt((transactions * params.aht) / params.interval + 0.5)
+    no_agents = 1 if erlangs < 1 else int(erlangs // 1)
+    while trafficrate / no_agents >= 1:
+        no_agents += 1
+    return no_agents
+
+#   -------------------------------------------------------------------------------------------
+#   AgentsErlangC (ErlangParams, int, int, float, function)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       service_time = target answer time in seconds e.g. 15
+#       transactions = the number of transactions received in the given interval period
+#       accuracy     = a service level above 1 - accuracy is treated as met
+#       series       = optional function (start, intensity) used instead of ErlangCSeries
+#   -------------------------------------------------------------------------------------------
+#   Returns (int, float) - number of agents required to meet params.sla (capped at 1) and the
+#                          probability of a transaction being queued with that number of agents.
+#   -------------------------------------------------------------------------------------------
+def AgentsErlangC(params, service_time, transactions, accuracy=MaxAccuracy, series=None):
+    sla = min(params.sla, 1)
+    trafficrate = transactions / params.deathrate
+    no_agents = StartAgents(params, transactions)
+    maxiterate = no_agents * 100
+    if series is None:
+        steps = ErlangCSeries(params, no_agents, trafficrate)
+    else:
+        steps = series(no_agents, trafficrate)
+    i = 1
+    while i < maxiterate:
+        server, C = next(steps)
+        SLQueued = 1 - C * math.exp((trafficrate - server) * service_time / params.aht)
+        if SLQueued < 0:
+            SLQueued = 0
+        # put a limit on the accuracy required (it will never actually get to 100%)
+        if SLQueued >= sla or SLQueued > (1 - accuracy):
+            return no_agents, C
+        no_agents += 1
+        i += 1
+    # target not reached within maxiterate - no_agents is one past the last value tried
+    server, C = next(steps)
+    return no_agents, C
+
+def Agents(params, service_time, transactions, accuracy=MaxAccuracy, series=None):
+    return AgentsErlangC(params, service_time, transactions, accuracy, series)[0]
+
+#   -------------------------------------------------------------------------------------------
+#   AgentASA (ErlangParams, int, int, function)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       asa          = the Average Speed of Answer in seconds, below 0 is taken as 1
+#       transactions = the number of transactions received in the given interval period
+#       series       = optional function (start, intensity) used instead of ErlangCSeries
+#   -------------------------------------------------------------------------------------------
+#   Returns (int) - Number of agents required per interval to meet asa.
+#   -------------------------------------------------------------------------------------------
+def AgentASA(params, asa, transactions, series=None):
+    if asa < 0:
+        asa = 1
+    trafficrate = transactions / params.deathrate
+    no_agents = StartAgents(params, transactions)
+    maxiterate = no_agents * 100
+    if series is None:
+        steps = ErlangCSeries(params, no_agents, trafficrate)
+    else:
+        steps = series(no_agents, trafficrate)
+    i = 1
+    while i < maxiterate:
+        server, C = next(steps)
+        utilisation = trafficrate / no_agents
+        answertime = C / (server * params.deathrate * (1 - utilisation))
+        if (answertime * params.interval) < asa:
+            break
+        i += 1
+        no_agents += 1
+    return no_agents
+
+#   -------------------------------------------------------------------------------------------
+#   FractionalAgents (ErlangParams, int, int, float, function)
+#   -------------------------------------------------------------------------------------------
+#   Returns (float) - the agents required to meet params.sla, with the fraction of the last
+#                     agent interpolated on the service level, see Erlang.FractionalAgents.
+#   -------------------------------------------------------------------------------------------
+def FractionalAgents(params, service_time, transactions, accuracy=MaxAccuracy, series=None):
+    sla = min(params.sla, 1)
+    trafficrate = transactions / params.deathrate
+    no_agents = StartAgents(params, transactions)
+    if series is None:
+        steps = ErlangCSeries(params, no_agents, trafficrate)
+    else:
+        steps = series(no_agents, trafficrate)
+    sl_queued = 0
+    last_slq  = 0
+    while True:
+        last_slq = sl_queued
+        servers, C = next(steps)
+        sl_queued = base.MinMax(1 - C * math.exp((trafficrate - servers) * service_time / params.aht), 0, 1)
+        # put a limit on the accuracy required (it will never actually get to 100%)
+        if sl_queued >= sla or sl_queued > (1 - accuracy):
+            break
+        no_agents += 1
+    # do we need to calculate a fraction?
+    if sl_queued > sla:
+        return ((sla - last_slq) / (sl_queued - last_slq)) + (no_agents - 1)
+    return no_agents
+
+#   -------------------------------------------------------------------------------------------
+#   Interval KPIs (ErlangParams, int, int, ..., function)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       agents       = number of agents available
+#       transactions = the number of transactions received in the given interval period
+#       erlangc      = optional function (agents, intensity) used instead of ErlangC
+#   -------------------------------------------------------------------------------------------
+#   Same formulas as the methods of Erlang with the same names.
+#   -------------------------------------------------------------------------------------------
+def QueueProbability(params, agents, trafficrate, erlangc):
+    if erlangc is None:
+        return ErlangC(params, agents, trafficrate)
+    return erlangc(agents, trafficrate)
+
+# without agents the interval has no utilisation, fail before ErlangC is evaluated
+def NeedAgents(agents):
+    if agents == 0:
+        raise ZeroDivisionError("agents must be larger than 0!")
+
+# utilisation used in the waiting time formulas, an overloaded interval counts as 99%
+def Capped(utilisation):
+    return 0.99 if utilisation >= 1 else utilisation
+
+# Returns (float) - Percentage of calls abandoned within interval
+def Abandon(params, agents, transactions, erlangc=None):
+    trafficrate = transactions / params.deathrate
+    NeedAgents(agents)
+    C = QueueProbability(params, agents, trafficrate, erlangc)
+    # take all queueing calls (C) and subtract calls queueing within abandontime
+    return base.MinMax(C * math.exp((trafficrate - agents) * (params.abnt / params.aht)), 0, 1)
+
+# Returns (int) - Average speed of answer in seconds
+def ASA(params, agents, transactions, erlangc=None):
+    trafficrate = transactions / params.deathrate
+    utilisation = Capped(trafficrate / agents)
+    C = QueueProbability(params, agents, trafficrate, erlangc)
+    return base.intervals_to_secs(C / (agents * params.deathrate * (1 - utilisation)), params.interval)
+
+# Returns (float) - the percentage of calls which will queue
+def Queued(params, agents, transactions, erlangc=None):
+    trafficrate = transactions / params.deathrate
+    return base.MinMax(QueueProbability(params, agents, trafficrate, erlangc), 0, 1)
+
+# Returns (int) - the average queue size
+def QueueSize(params, agents, transactions, erlangc=None):
+    trafficrate = transactions / params.deathrate
+    utilisation = Capped(trafficrate / agents)
+    C = QueueProbability(params, agents, trafficrate, erlangc)
+    return base.FixInt((utilisation * C) / (1 - utilisation) + 0.5)
+
+# Returns (int) - the average queue time in seconds for those calls which will queue
+def QueueTime(params, agents, transactions):
+    trafficrate = transactions / params.deathrate
+    utilisation = Capped(trafficrate / agents)
+    return base.intervals_to_secs(1 / (agents * params.deathrate * (1 - utilisation)), params.interval)
+
+# Returns (float) - the service level achieved within service_time seconds
+def SLA(params, agents, transactions, service_time, erlangc=None):
+    trafficrate = transactions / params.deathrate
+    NeedAgents(agents)
+    C = QueueProbability(params, agents, trafficrate, erlangc)
+    return base.MinMax(1 - C * math.exp((trafficrate - agents) * service_time / params.aht), 0, 1)
+
+# Returns (float) - the utilisation percentage
+def Utilisation(params, agents, transactions):
+    return base.MinMax(transactions / params.deathrate / agents, 0, 1)
+
+#   -------------------------------------------------------------------------------------------
+#   IntervalKPI (ErlangParams, int, int, int, float)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       C = ErlangC for agents and the traffic intensity of transactions
+#   -------------------------------------------------------------------------------------------
+#   sla and abandon are 0 when their exponential overflows in an understaffed interval, as in
+#   Erlang.IntervalKPI_batch.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - utilisation, sla, asa, abandon, queued, queue_time and queue_size.
+#   -------------------------------------------------------------------------------------------
+def IntervalKPI(params, agents, transactions, service_time, C):
+    kpi = {'utilisation': 0, 'sla': 0, 'asa': 0, 'abandon': 0,
+           'queued': 0, 'queue_time': 0, 'queue_size': 0}
+    trafficrate = transactions / params.deathrate
+    kpi['utilisation'] = base.MinMax(trafficrate / agents, 0, 1)
+    kpi['queued'] = base.MinMax(C, 0, 1)
+    utilisation = Capped(trafficrate / agents)
+    kpi['asa'] = base.intervals_to_secs(C / (agents * params.deathrate * (1 - utilisation)), params.interval)
+    kpi['queue_time'] = base.intervals_to_secs(1 / (agents * params.deathrate * (1 - utilisation)), params.interval)
+    kpi['queue_size'] = base.FixInt((utilisation * C) / (1 - utilisation) + 0.5)
+    try:
+        kpi['sla'] = base.MinMax(1 - C * math.exp((trafficrate - agents) * service_time / params.aht), 0, 1)
+        kpi['abandon'] = base.MinMax(C * math.exp((trafficrate - agents) * (params.abnt / params.aht)), 0, 1)
+    except OverflowError:
+        pass
+    return kpi
@@ -0,0 +1,237 @@
+# Erlang Library for contact center operations forecasting
+# Chunked columnar reading of forecasts and writing of plans
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import csv
+import itertools
+import numpy as np
+import erlang_parallel
+
+# columns of a plan, as returned by Erlang.plan
+PlanColumns = ('label', 'transactions', 'agents', 'utilisation', 'sla', 'asa',
+               'abandon', 'queued', 'queue_time', 'queue_size')
+# rows read, solved and written at a time, bounds the memory used whatever the file size
+ChunkRows = 1 << 18
+IntColumns = ('agents', 'asa', 'queue_time', 'queue_size')
+Formats = ('csv', 'parquet')
+
+#   -------------------------------------------------------------------------------------------
+#   FileFormat (str, str)
+#   -------------------------------------------------------------------------------------------
+#   Returns (str) - format if given, else 'parquet' for .parquet / .pq files and 'csv' for others.
+#   -------------------------------------------------------------------------------------------
+def FileFormat(path, format=None):
+    if format is None:
+        format = 'parquet' if str(path).lower().endswith(('.parquet', '.pq')) else 'csv'
+    if format not in Formats:
+        raise ValueError("format must be one of {}!".format(', '.join(Formats)))
+    return format
+
+#   -------------------------------------------------------------------------------------------
+#   ReadChunks (str, list, list, int, str)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       path       = CSV file with a header row, or Parquet file
+#       columns    = names of the columns to read
+#       numeric    = names of the columns read as float, the others are read as str
+#       chunk_rows = number of rows per chunk (default ChunkRows)
+#       format     = 'csv' or 'parquet', default from the file extension
+#   -------------------------------------------------------------------------------------------
+#   CSV chunks are parsed by numpy.loadtxt, once for the numeric and once for the text columns,
+#   so no Python objects are made per row other than the line read. Blank lines are skipped.
+#   Parquet files are read a record batch at a time with pyarrow, which is only imported for
+#   Parquet files.
+#   -------------------------------------------------------------------------------------------
+#   Yields (dict of arrays) - one array per column, chunk_rows rows or fewer for the last chunk
+#                             and chunks with blank lines.
+#   -------------------------------------------------------------------------------------------
+def ReadChunks(path, columns, numeric=(), chunk_rows=ChunkRows, format=None):
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be larger than 0!")
+    if FileFormat(path, format) == 'parquet':
+        return ReadParquet(path, columns, numeric, chunk_rows)
+    return ReadCsv(path, columns, numeric, chunk_rows)
+
+def ReadCsv(path, columns, numeric, chunk_rows):
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]), [])
+        header = [name.strip() for name in header]
+        missing = [name for name in columns if name not in header]
+        if missing:
+            raise ValueError("{} has no column {}!".format(path, ', '.join(missing)))
+        numbers = [name for name in columns if name in numeric]
+        texts = [name for name in columns if name not in numeric]
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            # blank lines carry no data, numpy warns about them or fails on them
+            lines = [line for line in lines if not line.isspace()]
+            if not lines:
+                continue
+            chunk = {}
+            if numbers:
+                values = np.loadtxt(lines, delimiter=',', quotechar='"', dtype=float, ndmin=2,
+                                    usecols=[header.index(name) for name in numbers])
+                for i, name in enumerate(numbers):
+                    chunk[name] = values[:, i]
+            if texts:
+                values = np.loadtxt(lines, delimiter=',', quotechar='"', dtype=str, ndmin=2,
+                                    usecols=[header.index(name) for name in texts])
+                for i, name in enumerate(texts):
+                    chunk[name] = np.char.strip(values[:, i])
+            yield {name: chunk[name] for name in columns}
+
+def ReadParquet(path, columns, numeric, chunk_rows):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+        chunk = {}
+        for name in columns:
+            values = batch.column(name).to_numpy(zero_copy_only=False)
+            chunk[name] = values.astype(float) if name in numeric else values.astype(str)
+        yield chunk
+
+#   -------------------------------------------------------------------------------------------
+#   ChunkWriter
+#   -------------------------------------------------------------------------------------------
+#   Writes dicts of equally long arrays to a CSV or Parquet file, one chunk at a time. CSV
+#   values are formatted a column at a time with numpy, Parquet chunks are written as row
+#   groups with pyarrow. Use as a context manager or call Close.
+#   -------------------------------------------------------------------------------------------
+class ChunkWriter:
+
+    #   __init__ (str, str)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   path   - file to write
+    #   format - 'csv' or 'parquet', default from the file extension
+    def __init__(self, path, format=None):
+        self.path   = path
+        self.format = FileFormat(path, format)
+        self.file   = None
+        self.writer = None
+        self.names  = None
+        self.rows   = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def Write(self, chunk):
+        if self.names is None:
+            self.names = list(chunk)
+            if self.format == 'csv':
+                self.file = open(self.path, 'w', newline='')
+                self.file.write(','.join(self.names) + '\n')
+        elif list(chunk) != self.names:
+            raise ValueError("All chunks must have the columns {}!".format(', '.join(self.names)))
+        if self.format == 'csv':
+            self.WriteCsv(chunk)
+        else:
+            self.WriteParquet(chunk)
+        self.rows += len(chunk[self.names[0]])
+
+    def WriteCsv(self, chunk):
+        columns = []
+        for name in self.names:
+            # plan columns repeat few distinct values, so only those are formatted
+            values, inverse = np.unique(np.asarray(chunk[name]), return_inverse=True)
+            text = values.astype(str)
+            if values.dtype.kind in 'US':
+                # quote text containing the delimiter or quotes
+                special = (np.char.find(text, ',') >= 0) | (np.char.find(text, '"') >= 0)
+                if special.any():
+                    quoted = np.char.add(np.char.add('"', np.char.replace(text, '"', '""')), '"')
+                    text = np.where(special, quoted, text)
+            columns.append(text[inverse.ravel()].tolist())
+        if columns and columns[0]:
+            self.file.write('\n'.join(map(','.join, zip(*columns))) + '\n')
+
+    def WriteParquet(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({name: np.asarray(chunk[name]) for name in self.names})
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def Close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+#   -------------------------------------------------------------------------------------------
+#   PlanArrays (Erlang, array, int)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang       = Erlang object with the queue parameters
+#       transactions = array of the number of transactions per interval
+#       service_time = target answer time in seconds e.g. 15
+#   -------------------------------------------------------------------------------------------
+#   Every distinct volume is solved once with AgentsErlangC_batch and IntervalKPI_batch, which
+#   give the values of Erlang.plan.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict of arrays) - the columns of Erlang.plan other than label and transactions.
+#   -------------------------------------------------------------------------------------------
+def PlanArrays(erlang, transactions, service_time):
+    transactions = np.asarray(transactions, dtype=float)
+    values, inverse = np.unique(transactions, return_inverse=True)
+    agents, C = erlang.AgentsErlangC_batch(service_time, values)
+    result = {'agents': agents}
+    result.update(erlang.IntervalKPI_batch(agents, values, service_time, C))
+    return {name: result[name][inverse].reshape(transactions.shape) for name in PlanColumns[2:]}
+
+#   -------------------------------------------------------------------------------------------
+#   PlanFile (str, str, dict, int, str, str, str, str, str)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       source       = forecast file, CSV with a header row or Parquet
+#       target       = plan file to write, CSV or Parquet
+#       profiles     = dict of queue name to queue configuration with the keys params and
+#                      service_time, see erlang_parallel.PlanQueue
+#       chunk_rows   = number of rows read, solved and written at a time (default ChunkRows)
+#       queue        = name of the queue column, None if the file holds one queue only, in
+#                      which case profiles must hold exactly one profile
+#       label        = name of the interval label column
+#       transactions = name of the transactions column
+#       source_format, target_format = 'csv' or 'parquet', default from the file extension
+#   -------------------------------------------------------------------------------------------
+#   Streams the forecast through the staffing calculation: every chunk is split by queue, each
+#   queue's volumes are solved as arrays with PlanArrays and the plan rows are written in the
+#   order they were read. Only one chunk is held in memory at a time.
+#   -------------------------------------------------------------------------------------------
+#   Returns (int) - the number of rows written.
+#   -------------------------------------------------------------------------------------------
+def PlanFile(source, target, profiles, chunk_rows=ChunkRows, queue='queue', label='label',
+             transactions='transactions', source_format=None, target_format=None):
+    erlangs = {name: erlang_parallel.MakeErlang(profile['params']) for name, profile in profiles.items()}
+    if queue is None and len(erlangs) != 1:
+        raise ValueError("A file without a queue column needs exactly one profile!")
+    columns = [label, transactions] if queue is None else [queue, label, transactions]
+    with ChunkWriter(target, target_format) as writer:
+        for chunk in ReadChunks(source, columns, [transactions], chunk_rows, source_format):
+            volumes = chunk[transactions]
+            plan = {'label': chunk[label], 'transactions': volumes}
+            for name in PlanColumns[2:]:
+                plan[name] = np.zeros(volumes.size, dtype=int if name in IntColumns else float)
+            if queue is None:
+                rows = {next(iter(erlangs)): slice(None)}
+            else:
+                names, inverse = np.unique(chunk[queue], return_inverse=True)
+                rows = {name: inverse == i for i, name in enumerate(names.tolist())}
+            for name, mask in rows.items():
+                if name not in erlangs:
+                    raise ValueError("No profile for queue {}!".format(name))
+                part = PlanArrays(erlangs[name], volumes[mask], profiles[name]['service_time'])
+                for column, values in part.items():
+                    plan[column][mask] = values
+            if queue is not None:
+                plan = dict([('queue', chunk[queue])] + list(plan.items()))
+            writer.Write(plan)
+        return writer.rows
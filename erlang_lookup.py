@@ -0,0 +1,208 @@
+# Erlang Library for contact center operations forecasting
+# Precomputed staffing lookup tables
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import json
+import numpy as np
+import erlang_c
+
+#   -------------------------------------------------------------------------------------------
+#   Binary table file layout (all values little endian):
+#       8 bytes   magic 'ERLTBL01'
+#       8 bytes   length of the JSON header in bytes
+#       n bytes   JSON header - {"meta": {...}, "columns": [{"name", "dtype", "length", "offset"}]}
+#       columns   raw column data, starting at the first multiple of 64 bytes after the header.
+#                 Column offsets are relative to that start and are multiples of 64 bytes too.
+#   Columns are memory-mapped read-only when the file is opened, so opening a table costs the
+#   same whatever its size and only the pages actually looked up are read from disk.
+#   -------------------------------------------------------------------------------------------
+TableMagic = b'ERLTBL01'
+TableAlign = 64
+
+def Align(size):
+    return -(-size // TableAlign) * TableAlign
+
+#   -------------------------------------------------------------------------------------------
+#   WriteArrays (str, dict, dict)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       path   = file to write
+#       meta   = JSON serialisable dictionary stored with the columns
+#       arrays = dictionary of column name -> 1-dimensional NumPy array
+#   -------------------------------------------------------------------------------------------
+def WriteArrays(path, meta, arrays):
+    columns = []
+    data    = []
+    offset  = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        values = values.astype(values.dtype.newbyteorder('<'), copy=False)
+        columns.append({'name': name, 'dtype': values.dtype.str, 'length': int(values.size),
+                        'offset': offset})
+        data.append(values)
+        offset += Align(values.nbytes)
+    header = json.dumps({'meta': meta, 'columns': columns}).encode('utf-8')
+    data_start = Align(len(TableMagic) + 8 + len(header))
+    with open(path, 'wb') as f:
+        f.write(TableMagic)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for column, values in zip(columns, data):
+            f.seek(data_start + column['offset'])
+            f.write(values.tobytes())
+
+#   -------------------------------------------------------------------------------------------
+#   MapArrays (str)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       path = file written by WriteArrays
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict, dict) - the meta dictionary and column name -> read-only memory-mapped array.
+#   -------------------------------------------------------------------------------------------
+def MapArrays(path):
+    with open(path, 'rb') as f:
+        if f.read(len(TableMagic)) != TableMagic:
+            raise ValueError(path + " is not an Erlang table file!")
+        size = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(size).decode('utf-8'))
+    data_start = Align(len(TableMagic) + 8 + size)
+    arrays = {}
+    for column in header['columns']:
+        if column['length'] == 0:
+            arrays[column['name']] = np.zeros(0, dtype=column['dtype'])
+        else:
+            arrays[column['name']] = np.memmap(path, dtype=column['dtype'], mode='r',
+                                               offset=data_start + column['offset'],
+                                               shape=(column['length'],))
+    return header['meta'], arrays
+
+
+class StaffingTable:
+    err_range = 'Value error - max_transactions must be at least 0'
+
+    #   __init__ (dict, dict)
+    #   -------------------------------------------------------------------------------------------
+    #   Use StaffingTable.Build to calculate a table and StaffingTable.Load to open a saved one.
+    #   -------------------------------------------------------------------------------------------
+    def __init__(self, meta, columns):
+        self.meta             = meta
+        self.columns          = columns
+        self.service_time     = meta['service_time']
+        self.max_transactions = meta['max_transactions']
+        # used for transaction volumes outside of the table
+        self.erlang           = erlang_c.Erlang(*meta['params'])
+
+    #   -------------------------------------------------------------------------------------------
+    #   Build (Erlang, int, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       erlang           = Erlang object holding the profile (sla, aht, interval, ...)
+    #       service_time     = target answer time in seconds e.g. 15
+    #       max_transactions = largest transaction volume per interval held in the table
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (StaffingTable) - agents, sla, asa and utilisation for every transaction volume
+    #                             from 0 to max_transactions.
+    #   -------------------------------------------------------------------------------------------
+    @classmethod
+    def Build(cls, erlang, service_time, max_transactions):
+        max_transactions = int(max_transactions)
+        if max_transactions < 0:
+            raise ValueError(cls.err_range)
+        volumes = np.arange(max_transactions + 1)
+        day = erlang.plan(zip(volumes, volumes), service_time)
+        columns = {'agents':      day['agents'].astype(np.int32),
+                   'sla':         day['sla'],
+                   'asa':         day['asa'].astype(np.int32),
+                   'utilisation': day['utilisation']}
+        meta = {'params': cls.Params(erlang), 'service_time': service_time,
+                'max_transactions': max_transactions}
+        return cls(meta, columns)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Params (Erlang)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (list) - the constructor parameters of the Erlang object.
+    #   -------------------------------------------------------------------------------------------
+    @staticmethod
+    def Params(erlang):
+        return [erlang.sla, erlang.tta, erlang.ait, erlang.aiw, erlang.abnt, erlang.max_wait,
+                erlang.nv, erlang.ccc, erlang.interval // 60, erlang.ops_hrs]
+
+    def Save(self, path):
+        WriteArrays(path, self.meta, self.columns)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Load (str)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (StaffingTable) - the table saved in path, with its columns memory-mapped.
+    #   -------------------------------------------------------------------------------------------
+    @classmethod
+    def Load(cls, path):
+        meta, columns = MapArrays(path)
+        return cls(meta, columns)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Matches (Erlang, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (bool) - True if the table was built for the profile of erlang and service_time.
+    #   -------------------------------------------------------------------------------------------
+    def Matches(self, erlang, service_time):
+        return self.Params(erlang) == self.meta['params'] and service_time == self.service_time
+
+    #   -------------------------------------------------------------------------------------------
+    #   Lookup (array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       transactions = transaction volume or array of transaction volumes
+    #   -------------------------------------------------------------------------------------------
+    #   Volumes which are whole numbers within the table are looked up by indexing, all others
+    #   are calculated with the Erlang solver.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict of arrays) - agents, sla, asa and utilisation for each volume.
+    #   -------------------------------------------------------------------------------------------
+    def Lookup(self, transactions):
+        volumes = np.asarray(transactions, dtype=float)
+        flat = volumes.ravel()
+        inside = (flat >= 0) & (flat <= self.max_transactions) & (flat == np.floor(flat))
+        index = np.where(inside, flat, 0).astype(np.intp)
+        result = {name: np.asarray(column[index]) for name, column in self.columns.items()}
+        for i in np.nonzero(~inside)[0]:
+            row = self.Solve(flat[i].item())
+            for name in result:
+                result[name][i] = row[name]
+        return {name: values.reshape(volumes.shape) for name, values in result.items()}
+
+    #   -------------------------------------------------------------------------------------------
+    #   Solve (float)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - agents, sla, asa and utilisation calculated with the Erlang solver.
+    #   -------------------------------------------------------------------------------------------
+    def Solve(self, transactions):
+        agents, C = self.erlang.AgentsErlangC(self.service_time, transactions)
+        kpi = self.erlang.IntervalKPI(agents, transactions, self.service_time, C)
+        return {'agents': agents, 'sla': kpi['sla'], 'asa': kpi['asa'],
+                'utilisation': kpi['utilisation']}
+
+    #   -------------------------------------------------------------------------------------------
+    #   Value (str, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns the column name for a single transaction volume - by indexing if the volume is
+    #   a whole number within the table, else calculated with the Erlang solver.
+    #   -------------------------------------------------------------------------------------------
+    def Value(self, name, transactions):
+        if 0 <= transactions <= self.max_transactions and transactions == int(transactions):
+            return self.columns[name][int(transactions)].item()
+        return self.Solve(transactions)[name]
+
+    def Agents(self, transactions):
+        return self.Value('agents', transactions)
+
+    def SLA(self, transactions):
+        return self.Value('sla', transactions)
+
+    def ASA(self, transactions):
+        return self.Value('asa', transactions)
+
+    def Utilisation(self, transactions):
+        return self.Value('utilisation', transactions)
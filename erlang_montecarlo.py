@@ -0,0 +1,107 @@
+# Erlang Library for contact center operations forecasting
+# Staffing under forecast uncertainty by Monte Carlo sampling of the volumes
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import numpy as np
+
+Percentiles = (50, 80, 95)
+
+#   -------------------------------------------------------------------------------------------
+#   Scenarios (array, array, int, int)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       mean    = forecast transactions per interval
+#       std     = standard deviation of the forecast per interval (or one value for all)
+#       samples = number of scenarios (default 1000)
+#       seed    = seed of the random numbers, the same seed gives the same scenarios
+#   -------------------------------------------------------------------------------------------
+#   Volumes are drawn from a gamma distribution with the mean and standard deviation of each
+#   interval, which is never negative and skewed to the right like real forecast errors, and
+#   rounded to whole transactions. Intervals with no deviation keep their mean.
+#   -------------------------------------------------------------------------------------------
+#   Returns (array) - transactions with shape (samples, intervals).
+#   -------------------------------------------------------------------------------------------
+def Scenarios(mean, std, samples=1000, seed=None):
+    mean, std = np.broadcast_arrays(np.asarray(mean, dtype=float), np.asarray(std, dtype=float))
+    mean, std = mean.ravel(), std.ravel()
+    if samples < 1:
+        raise ValueError("samples must be larger than 0!")
+    if (mean < 0).any() or (std < 0).any():
+        raise ValueError("mean and std cannot be less than 0!")
+    rng = np.random.default_rng(seed)
+    spread = (std > 0) & (mean > 0)
+    volumes = np.tile(mean, (samples, 1))
+    if spread.any():
+        shape = (mean[spread] / std[spread]) ** 2
+        scale = std[spread] ** 2 / mean[spread]
+        volumes[:, spread] = rng.gamma(shape, scale, (samples, int(spread.sum())))
+    return np.round(volumes)
+
+#   -------------------------------------------------------------------------------------------
+#   ExpectedSLA (Erlang, array, array, int)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang       = Erlang object with the queue parameters
+#       agents       = agents per interval (or one value for all intervals)
+#       scenarios    = transactions with shape (samples, intervals), e.g. from Scenarios
+#       service_time = target answer time in seconds e.g. 15
+#   -------------------------------------------------------------------------------------------
+#   The SLA of every scenario is evaluated as in Erlang.SLA, with ErlangC_batch over the
+#   distinct (agents, transactions) pairs only.
+#   -------------------------------------------------------------------------------------------
+#   Returns (array) - the mean SLA over the scenarios, per interval.
+#   -------------------------------------------------------------------------------------------
+def ExpectedSLA(erlang, agents, scenarios, service_time):
+    scenarios = np.atleast_2d(np.asarray(scenarios, dtype=float))
+    agents = np.broadcast_to(np.asarray(agents, dtype=float), scenarios.shape[1:])
+    # number the distinct pairs through the distinct values of each
+    counts, count_index = np.unique(np.broadcast_to(agents, scenarios.shape), return_inverse=True)
+    volumes, volume_index = np.unique(scenarios, return_inverse=True)
+    keys, inverse = np.unique(count_index.ravel() * volumes.size + volume_index.ravel(), return_inverse=True)
+    n, trafficrate = counts[keys // volumes.size], volumes[keys % volumes.size] / erlang.deathrate
+    C = erlang.ErlangC_batch(n, trafficrate)
+    with np.errstate(over='ignore', invalid='ignore'):
+        sla = np.clip(1 - C * np.exp((trafficrate - n) * service_time / erlang.aht), 0, 1)
+    # Erlang.SLA returns 0 without agents or when the exponential overflows
+    sla = np.where((n > 0) & np.isfinite(sla), sla, 0.0)
+    return sla[inverse.ravel()].reshape(scenarios.shape).mean(axis=0)
+
+#   -------------------------------------------------------------------------------------------
+#   Staffing (Erlang, int, array, list, array)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang       = Erlang object with the queue parameters
+#       service_time = target answer time in seconds e.g. 15
+#       scenarios    = transactions with shape (samples, intervals), e.g. from Scenarios
+#       percentiles  = percentiles of the required agents to return (default 50, 80, 95)
+#       agents       = optional head count per interval to evaluate the expected SLA for
+#   -------------------------------------------------------------------------------------------
+#   The agents required by every scenario are found with Erlang.AgentsErlangC_batch over the
+#   distinct volumes, so the cost grows with the number of distinct volumes drawn rather than
+#   with the number of samples.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict of arrays) - per interval:
+#       required         - agents required by every scenario, shape (samples, intervals)
+#       p50, p80, p95    - agents required by at least that share of the scenarios (one key
+#                          per percentile)
+#       sla_p50, ...     - expected SLA over the scenarios when staffing at that percentile
+#       sla              - expected SLA at agents, if given
+#   -------------------------------------------------------------------------------------------
+def Staffing(erlang, service_time, scenarios, percentiles=Percentiles, agents=None):
+    scenarios = np.atleast_2d(np.asarray(scenarios, dtype=float))
+    if (scenarios < 0).any():
+        raise ValueError(''.join(erlang.err_val_ltz))
+    volumes, inverse = np.unique(scenarios, return_inverse=True)
+    required, C = erlang.AgentsErlangC_batch(service_time, volumes)
+    required = required[inverse.ravel()].reshape(scenarios.shape)
+    result = {'required': required}
+    for p in percentiles:
+        if not 0 <= p <= 100:
+            raise ValueError("percentiles must be between 0 and 100!")
+        staff = np.percentile(required, p, axis=0, method='inverted_cdf').astype(int)
+        result['p{:g}'.format(p)] = staff
+        result['sla_p{:g}'.format(p)] = ExpectedSLA(erlang, staff, scenarios, service_time)
+    if agents is not None:
+        result['sla'] = ExpectedSLA(erlang, agents, scenarios, service_time)
+    return result
@@ -0,0 +1,275 @@
+# Erlang Library for contact center operations forecasting
+# Multi-skill staffing of blended agent groups
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import copy
+import heapq
+import math
+from collections import deque
+import numpy as np
+import erlang_parallel
+
+#   -------------------------------------------------------------------------------------------
+#   MultiSkill
+#   -------------------------------------------------------------------------------------------
+#   Staffing of agent groups that share several queues, e.g. agents blended across voice, chat
+#   and email. Every queue keeps its own Erlang parameters, so nv and ccc still set the handle
+#   time of a chat queue. Every group has a list of the queues it can handle, in the order its
+#   agents pick work. A transaction is routed to the groups that have its queue highest on their
+#   list first (the specialists) and to the other groups after that.
+#
+#   Staff decomposes the system into one Erlang C queue per group: every group gets a share of
+#   the workload of its queues and is staffed for its pooled workload, with the strictest service
+#   level of its queues. It starts with every queue handled by the groups that have it highest
+#   on their list, then iterates: workload is moved from one group to another group with the
+#   same skill whenever that lowers the total head count, until no move does. Refine optionally
+#   checks the result with a discrete-event simulation of the routing and adds agents where a
+#   queue misses its service level.
+#   -------------------------------------------------------------------------------------------
+class MultiSkill:
+    # share of a group's workload tried per move, halved down to MinStep when no move helps
+    Step    = 0.5
+    MinStep = 1 / 64
+
+    #   __init__ (list, dict)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   queues - sequence of queue definitions, dicts with the keys
+    #            name         - name of the queue
+    #            params       - Erlang constructor parameters (see erlang_parallel.PlanQueue), or
+    #            erlang       - an Erlang object
+    #            transactions - the number of transactions received in the interval
+    #            service_time - target answer time in seconds e.g. 15
+    #   groups - dict of group name to the list of queue names its agents handle, in the order
+    #            they pick work
+    def __init__(self, queues, groups):
+        self.names = [queue['name'] for queue in queues]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Queue names must be unique!")
+        self.erlangs = []
+        for queue in queues:
+            ec = queue.get('erlang')
+            self.erlangs.append(ec if ec is not None else erlang_parallel.MakeErlang(queue['params']))
+        if len(set(ec.interval for ec in self.erlangs)) > 1:
+            raise ValueError("All queues must use the same interval!")
+        self.interval     = self.erlangs[0].interval
+        self.transactions = np.array([queue['transactions'] for queue in queues], dtype=float)
+        self.service_time = np.array([queue['service_time'] for queue in queues], dtype=float)
+        self.aht          = np.array([ec.aht for ec in self.erlangs], dtype=float)
+        # workload in Erlangs
+        self.load         = self.transactions * self.aht / self.interval
+        self.groups       = list(groups)
+        index = {name: q for q, name in enumerate(self.names)}
+        self.skills = []
+        for group in self.groups:
+            skills = [index[name] for name in groups[group] if name in index]
+            if len(skills) != len(groups[group]):
+                raise ValueError("Group {} has an unknown queue!".format(group))
+            self.skills.append(skills)
+        # routing: for every queue the groups having it, highest on their list first
+        self.routes = []
+        for q in range(len(self.names)):
+            ranked = sorted((skills.index(q), g) for g, skills in enumerate(self.skills) if q in skills)
+            if not ranked:
+                raise ValueError("No group handles queue {}!".format(self.names[q]))
+            self.routes.append([g for rank, g in ranked])
+        self.memo = {}
+
+    #   -------------------------------------------------------------------------------------------
+    #   GroupAgents (int, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       g     = index of the group
+    #       share = workload in Erlangs of every queue handled by the group
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (int) - Erlang C agents for the pooled workload. The pooled handle time is the
+    #                   workload weighted handle time, the service level and service time are the
+    #                   strictest of the queues with workload. Results are memoised.
+    #   -------------------------------------------------------------------------------------------
+    def GroupAgents(self, g, share):
+        used = np.nonzero(share > 1E-12)[0]
+        if used.size == 0:
+            return 0
+        transactions = share[used] * self.interval / self.aht[used]
+        total = float(transactions.sum())
+        aht = float(share[used].sum()) * self.interval / total
+        target = max(used, key=lambda q: self.erlangs[q].sla)
+        service_time = float(self.service_time[used].min())
+        key = (self.erlangs[target].sla, service_time, round(aht, 9), round(total, 9))
+        agents = self.memo.get(key)
+        if agents is None:
+            ec = copy.copy(self.erlangs[target])
+            ec.DisableCache()
+            ec.aht       = aht
+            ec.deathrate = ec.interval / aht
+            agents = ec.AgentsErlangC(service_time, total)[0]
+            self.memo[key] = agents
+        return agents
+
+    #   -------------------------------------------------------------------------------------------
+    #   Staff (int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       max_rounds = largest number of passes over all possible moves (default 50)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - agents (total), groups (agents per group), share (workload in Erlangs
+    #                    per group and queue), standalone (Erlang C agents per queue if every
+    #                    queue had its own agents) and rounds (passes made).
+    #   -------------------------------------------------------------------------------------------
+    def Staff(self, max_rounds=50):
+        groups, queues = len(self.groups), len(self.names)
+        share = np.zeros((groups, queues))
+        for q, route in enumerate(self.routes):
+            best = self.skills[route[0]].index(q)
+            primary = [g for g in route if self.skills[g].index(q) == best]
+            share[primary, q] = self.load[q] / len(primary)
+        agents = np.array([self.GroupAgents(g, share[g]) for g in range(groups)])
+        step = self.Step
+        rounds = 0
+        while rounds < max_rounds:
+            rounds += 1
+            improved = False
+            for q, route in enumerate(self.routes):
+                for source in route:
+                    for target in route:
+                        if target == source or share[source, q] <= 0:
+                            continue
+                        moved = min(share[source, q], step * max(share[source].sum(), 1E-9))
+                        trial_source = share[source].copy()
+                        trial_target = share[target].copy()
+                        trial_source[q] -= moved
+                        trial_target[q] += moved
+                        a_source = self.GroupAgents(source, trial_source)
+                        a_target = self.GroupAgents(target, trial_target)
+                        if a_source + a_target < agents[source] + agents[target]:
+                            share[source], share[target] = trial_source, trial_target
+                            agents[source], agents[target] = a_source, a_target
+                            improved = True
+            if not improved:
+                if step <= self.MinStep:
+                    break
+                step /= 2
+        standalone = [self.erlangs[q].AgentsErlangC(self.service_time[q], self.transactions[q])[0]
+                      if self.transactions[q] > 0 else 0 for q in range(queues)]
+        return {
+            'agents':     int(agents.sum()),
+            'groups':     {name: int(agents[g]) for g, name in enumerate(self.groups)},
+            'share':      {name: {self.names[q]: float(share[g, q]) for q in range(queues) if share[g, q] > 0}
+                           for g, name in enumerate(self.groups)},
+            'standalone': {name: int(standalone[q]) for q, name in enumerate(self.names)},
+            'rounds':     rounds,
+        }
+
+    #   -------------------------------------------------------------------------------------------
+    #   Simulate (dict, int, int, bool, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       agents    = dict of group name to number of agents
+    #       intervals = number of consecutive intervals simulated (default 20)
+    #       seed      = seed of the random numbers, the same seed gives the same result
+    #       abandon   = callers abandon after an exponential patience with mean abnt
+    #       warmup    = number of intervals at the start left out of the KPIs (default 1)
+    #   -------------------------------------------------------------------------------------------
+    #   Discrete-event simulation of the routing: an arriving transaction goes to a free agent of
+    #   the first group on its route, or waits in the FIFO queue of its queue. An agent becoming
+    #   free takes the oldest waiting transaction of the first queue on its group's list that has
+    #   one. Handle times are exponential with the aht of the queue. Agent free times are kept
+    #   in a heap and the arrivals are numpy arrays.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - per queue name a dict with calls, sla (answered within service_time),
+    #                    asa (average wait of the answered calls) and abandon.
+    #   -------------------------------------------------------------------------------------------
+    def Simulate(self, agents, intervals=20, seed=None, abandon=True, warmup=1):
+        if intervals <= warmup or warmup < 0:
+            raise ValueError("intervals must be larger than warmup!")
+        rng      = np.random.default_rng(seed)
+        duration = intervals * self.interval
+        start    = warmup * self.interval
+        queues   = len(self.names)
+        counts   = rng.poisson(self.transactions * intervals)
+        arrival  = np.concatenate([rng.uniform(0, duration, count) for count in counts])
+        queue    = np.repeat(np.arange(queues), counts)
+        handle   = np.concatenate([rng.exponential(self.aht[q], counts[q]) for q in range(queues)])
+        if abandon:
+            patience = np.concatenate([rng.exponential(self.erlangs[q].abnt, counts[q]) for q in range(queues)])
+        else:
+            patience = np.full(arrival.size, math.inf)
+        order = np.argsort(arrival, kind='stable')
+        arrival, queue, handle, patience = arrival[order], queue[order], handle[order], patience[order]
+        wait     = np.full(arrival.size, -1.0)     # -1 for calls that abandoned
+        idle     = [int(agents.get(name, 0)) for name in self.groups]
+        waiting  = [deque() for q in range(queues)]
+        events   = []                              # (time agent becomes free, group)
+        routes, skills = self.routes, self.skills
+        handles, patiences, arrivals = handle.tolist(), patience.tolist(), arrival.tolist()
+
+        def Free(now, g):
+            for q in skills[g]:
+                line = waiting[q]
+                while line:
+                    i = line.popleft()
+                    if arrivals[i] + patiences[i] >= now:
+                        wait[i] = now - arrivals[i]
+                        heapq.heappush(events, (now + handles[i], g))
+                        return
+            idle[g] += 1
+
+        for i, (t, q) in enumerate(zip(arrivals, queue.tolist())):
+            while events and events[0][0] <= t:
+                now, g = heapq.heappop(events)
+                Free(now, g)
+            for g in routes[q]:
+                if idle[g] > 0:
+                    idle[g] -= 1
+                    wait[i] = 0.0
+                    heapq.heappush(events, (t + handles[i], g))
+                    break
+            else:
+                waiting[q].append(i)
+        while events and any(waiting):
+            now, g = heapq.heappop(events)
+            Free(now, g)
+        counted = arrival >= start
+        result = {}
+        for q, name in enumerate(self.names):
+            mine = counted & (queue == q)
+            calls = int(np.count_nonzero(mine))
+            answered = mine & (wait >= 0)
+            result[name] = {
+                'calls':   calls,
+                'sla':     float(np.count_nonzero(answered & (wait <= self.service_time[q]))) / calls if calls else 1.0,
+                'asa':     float(wait[answered].mean()) if answered.any() else 0.0,
+                'abandon': float(np.count_nonzero(mine & (wait < 0))) / calls if calls else 0.0,
+            }
+        return result
+
+    #   -------------------------------------------------------------------------------------------
+    #   Refine (dict, int, int, int, bool)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       agents     = dict of group name to number of agents, e.g. Staff()['groups']
+    #       max_rounds = largest number of simulations (default 20)
+    #       intervals, seed, abandon = see Simulate
+    #   -------------------------------------------------------------------------------------------
+    #   Simulates the staffing and, while a queue misses its service level, adds an agent to the
+    #   first group on the route of the queue missing it by most. Every round uses the same seed,
+    #   so the rounds only differ by the agents added.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - agents (total), groups (agents per group), simulated (the KPIs of the
+    #                    last simulation, see Simulate) and rounds (simulations run).
+    #   -------------------------------------------------------------------------------------------
+    def Refine(self, agents, max_rounds=20, intervals=20, seed=None, abandon=True):
+        agents = {name: int(agents.get(name, 0)) for name in self.groups}
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        rounds = 0
+        while True:
+            rounds += 1
+            simulated = self.Simulate(agents, intervals, seed, abandon)
+            gaps = [(self.erlangs[q].sla - simulated[name]['sla'], q) for q, name in enumerate(self.names)]
+            gap, q = max(gaps)
+            if gap <= 0 or rounds >= max_rounds:
+                break
+            agents[self.groups[self.routes[q][0]]] += 1
+        return {'agents': sum(agents.values()), 'groups': agents, 'simulated': simulated, 'rounds': rounds}
@@ -0,0 +1,97 @@
+# Erlang Library for contact center operations forecasting
+# Parallel planning of many queues
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import erlang_c
+
+#   -------------------------------------------------------------------------------------------
+#   PlanQueue (dict)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       queue = queue configuration with the keys
+#               params       - constructor parameters of Erlang, either a list in constructor
+#                              order (sla, tta, ait, aiw, abnt, max_wait, nv, ccc, interval,
+#                              ops_hrs) or a dict of keyword arguments
+#               intervals    - sequence of (label, transactions) rows
+#               service_time - target answer time in seconds e.g. 15
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict of arrays) - the result of Erlang.plan for the queue.
+#   -------------------------------------------------------------------------------------------
+def PlanQueue(queue):
+    return MakeErlang(queue['params']).plan(queue['intervals'], queue['service_time'])
+
+#   -------------------------------------------------------------------------------------------
+#   MakeErlang (list)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       params = constructor parameters of Erlang, a list in constructor order, a dict of keyword
+#                arguments or an ErlangParams
+#   -------------------------------------------------------------------------------------------
+#   The parameters are validated by ErlangParams, so an invalid queue raises ValueError in the
+#   caller instead of being planned with zeros as the Erlang constructor would.
+#   -------------------------------------------------------------------------------------------
+#   Returns (Erlang) - a new Erlang object for the queue.
+#   -------------------------------------------------------------------------------------------
+def MakeErlang(params):
+    return erlang_c.Erlang.FromParams(MakeParams(params))
+
+# Returns (ErlangParams) - the validated parameters, raises ValueError for invalid ones
+def MakeParams(params):
+    if isinstance(params, erlang_c.ErlangParams):
+        return params
+    if isinstance(params, dict):
+        return erlang_c.ErlangParams(**params)
+    return erlang_c.ErlangParams(*params)
+
+def RunChunk(function, chunk):
+    return [function(queue) for queue in chunk]
+
+#   -------------------------------------------------------------------------------------------
+#   PlanQueues (list, int, int)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       queues    = sequence of queue configurations, see PlanQueue
+#       workers   = number of worker processes, default os.cpu_count(). With 1 worker the
+#                   queues are planned in the calling process.
+#       chunksize = number of queues sent to a worker at once, default spreads the queues over
+#                   about 4 chunks per worker to amortise the pickling of queues and results
+#   -------------------------------------------------------------------------------------------
+#   The queues are fanned out over a process pool. Every queue is planned on its own, so the
+#   results do not depend on the number of workers or the chunk size.
+#   -------------------------------------------------------------------------------------------
+#   Returns (list) - the plan of each queue, in the order of queues.
+#   -------------------------------------------------------------------------------------------
+def PlanQueues(queues, workers=None, chunksize=None):
+    return MapQueues(PlanQueue, queues, workers, chunksize)
+
+#   -------------------------------------------------------------------------------------------
+#   MapQueues (function, list, int, int)
+#   -------------------------------------------------------------------------------------------
+#   Same as PlanQueues for any module level function taking one queue configuration, e.g.
+#   erlang_schedule.ScheduleQueue.
+#   -------------------------------------------------------------------------------------------
+#   Returns (list) - the result of function for each queue, in the order of queues.
+#   -------------------------------------------------------------------------------------------
+def MapQueues(function, queues, workers=None, chunksize=None):
+    queues = list(queues)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be larger than 0!")
+    if chunksize is None:
+        chunksize = max(1, -(-len(queues) // (workers * 4)))
+    if chunksize < 1:
+        raise ValueError("chunksize must be larger than 0!")
+    chunks = [queues[i:i + chunksize] for i in range(0, len(queues), chunksize)]
+    if workers == 1 or len(chunks) <= 1:
+        return RunChunk(function, queues)
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        # map returns the chunks in submission order
+        for done in pool.map(partial(RunChunk, function), chunks):
+            results.extend(done)
+    return results
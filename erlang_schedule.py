@@ -0,0 +1,156 @@
+# Erlang Library for contact center operations forecasting
+# Shift scheduling on top of the interval staffing requirements
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import numpy as np
+import erlang_parallel
+
+#   -------------------------------------------------------------------------------------------
+#   Requirements (Erlang, array, int, float)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang       = Erlang object with the queue parameters
+#       transactions = array of the number of transactions per interval
+#       service_time = target answer time in seconds e.g. 15
+#       shrinkage    = share of paid time agents are not available for transactions (breaks,
+#                      training, absence), 0 <= shrinkage < 1
+#   -------------------------------------------------------------------------------------------
+#   Returns (array of float) - FractionalAgents for every interval grossed up for shrinkage.
+#                              Every distinct number of transactions is only solved once and
+#                              intervals without transactions need no agents.
+#   -------------------------------------------------------------------------------------------
+def Requirements(erlang, transactions, service_time, shrinkage=0.0):
+    if shrinkage < 0 or shrinkage >= 1:
+        raise ValueError("shrinkage: 0 <= shrinkage < 1!")
+    transactions = np.asarray(transactions, dtype=float)
+    values, inverse = np.unique(transactions, return_inverse=True)
+    required = np.array([erlang.FractionalAgents(service_time, value) if value > 0 else 0.0
+                         for value in values.tolist()], dtype=float)
+    return required[inverse].reshape(transactions.shape) / (1 - shrinkage)
+
+#   -------------------------------------------------------------------------------------------
+#   Cover (array, list, list)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       heads   = array of the number of agents required per interval
+#       lengths = shift lengths in intervals
+#       blocks  = (first, stop) interval ranges a shift has to stay within, e.g. the days
+#   -------------------------------------------------------------------------------------------
+#   Greedy covering from left to right. At the first interval that is not covered a shift is
+#   started there (or as late as the block allows), so it covers as much of the remaining
+#   requirement as possible. Of the shift lengths the one with the largest share of intervals
+#   that still need agents is used, which keeps the rostered time that is not needed low, and
+#   the longer one on a tie, so fewer shifts are needed. For a single shift length this needs
+#   the fewest shifts possible.
+#   -------------------------------------------------------------------------------------------
+#   Returns (array, dict) - the coverage per interval and (start, length) -> number of shifts.
+#   -------------------------------------------------------------------------------------------
+def Cover(heads, lengths, blocks):
+    heads = np.asarray(heads, dtype=int)
+    coverage = np.zeros(heads.size, dtype=int)
+    shifts = {}
+    lengths = sorted(set(lengths), reverse=True)
+    for first, stop in blocks:
+        usable = [length for length in lengths if length <= stop - first]
+        if not usable:
+            raise ValueError("No shift length fits into {} intervals!".format(stop - first))
+        for t in range(first, stop):
+            while coverage[t] < heads[t]:
+                best = None
+                best_share = -1
+                for length in usable:
+                    start = min(t, stop - length)
+                    needed = coverage[start:start + length] < heads[start:start + length]
+                    share = np.count_nonzero(needed) / length
+                    if share > best_share:
+                        best, best_share = (start, length), share
+                start, length = best
+                # while every interval of the shift still needs agents, more of the same shift
+                # would be chosen next, so they are added at once
+                count = 1
+                if best_share == 1:
+                    count = int((heads[start:start + length] - coverage[start:start + length]).min())
+                count = min(count, heads[t] - coverage[t])
+                coverage[start:start + length] += count
+                shifts[best] = shifts.get(best, 0) + count
+    return coverage, shifts
+
+#   -------------------------------------------------------------------------------------------
+#   Schedule (Erlang, list, int, list, float)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang        = Erlang object with the queue parameters
+#       intervals     = sequence of (label, transactions) rows covering whole days of ops_hrs
+#                       each, e.g. 7 days of 96 15-minute intervals for ops_hrs = 24
+#       service_time  = target answer time in seconds e.g. 15
+#       shift_lengths = allowed shift lengths in hours e.g. [8, 6, 4], whole intervals each
+#       shrinkage     = share of paid time agents are not available for transactions
+#   -------------------------------------------------------------------------------------------
+#   Parameters provided in Class Constructor:
+#       interval = the forecasting interval 15, 30, 45, 60 minutes.
+#       ops_hrs  = operational hours per day. With 24 hours shifts can run past midnight,
+#                  otherwise every shift lies within one day.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - label, transactions, required (fractional agents after shrinkage), heads
+#                    (agents to roster), coverage and surplus as arrays per interval, shifts as
+#                    a list of (start label, hours, number of shifts) and agents, the total
+#                    number of shifts.
+#   -------------------------------------------------------------------------------------------
+def Schedule(erlang, intervals, service_time, shift_lengths, shrinkage=0.0):
+    labels = [label for label, transactions in intervals]
+    transactions = np.asarray([transactions for label, transactions in intervals], dtype=float)
+    per_day = int(erlang.ops_hrs * 3600 // erlang.interval)
+    if transactions.size % per_day != 0:
+        raise ValueError("intervals must cover whole days of {} intervals!".format(per_day))
+    lengths = []
+    for hours in shift_lengths:
+        length = hours * 3600 / erlang.interval
+        if length < 1 or length != int(length):
+            raise ValueError("Shift length {} is not a whole number of intervals!".format(hours))
+        lengths.append(int(length))
+    if erlang.ops_hrs == 24:
+        blocks = [(0, transactions.size)]
+    else:
+        blocks = [(first, first + per_day) for first in range(0, transactions.size, per_day)]
+    required = Requirements(erlang, transactions, service_time, shrinkage)
+    # a small tolerance keeps float noise in the shrinkage division from adding an agent
+    heads = np.ceil(required - 1E-09).astype(int)
+    coverage, shifts = Cover(heads, lengths, blocks)
+    hours = erlang.interval / 3600
+    return {
+        'label':        np.asarray(labels),
+        'transactions': transactions,
+        'required':     required,
+        'heads':        heads,
+        'coverage':     coverage,
+        'surplus':      coverage - heads,
+        'shifts':       [(labels[start], length * hours, count)
+                         for (start, length), count in sorted(shifts.items())],
+        'agents':       sum(shifts.values()),
+    }
+
+#   -------------------------------------------------------------------------------------------
+#   ScheduleQueue (dict)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       queue = queue configuration as for erlang_parallel.PlanQueue with the added keys
+#               shift_lengths - allowed shift lengths in hours
+#               shrinkage     - optional, default 0
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - the result of Schedule for the queue.
+#   -------------------------------------------------------------------------------------------
+def ScheduleQueue(queue):
+    ec = erlang_parallel.MakeErlang(queue['params'])
+    return Schedule(ec, queue['intervals'], queue['service_time'], queue['shift_lengths'],
+                    queue.get('shrinkage', 0.0))
+
+#   -------------------------------------------------------------------------------------------
+#   ScheduleQueues (list, int, int)
+#   -------------------------------------------------------------------------------------------
+#   Schedules many queues over a process pool, see erlang_parallel.PlanQueues.
+#   -------------------------------------------------------------------------------------------
+#   Returns (list) - the schedule of each queue, in the order of queues.
+#   -------------------------------------------------------------------------------------------
+def ScheduleQueues(queues, workers=None, chunksize=None):
+    return erlang_parallel.MapQueues(ScheduleQueue, queues, workers, chunksize)
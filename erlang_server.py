@@ -0,0 +1,300 @@
+# Erlang Library for contact center operations forecasting
+# Local HTTP/JSON service for shared Erlang profiles
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import erlang_parallel
+
+# methods that can be called through /evaluate, all take positional arguments
+Methods = ('ErlangB', 'ErlangBExt', 'EngsetB', 'ErlangC', 'NBTrunks', 'NumberTrunks', 'NumberAgents',
+           'Traffic', 'Abandon', 'Agents', 'AgentASA', 'ASA', 'CallCapacity', 'FractionalAgents',
+           'FractionalCallCapacity', 'Queued', 'QueueSize', 'QueueTime', 'ServiceTime', 'SLA',
+           'Trunks', 'Utilisation')
+# methods with an array form - concurrent requests with two arguments are evaluated in one call
+BatchMethods = {'ErlangB': 'ErlangB_batch', 'ErlangC': 'ErlangC_batch', 'Traffic': 'Traffic_batch'}
+Reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+MaxBody = 16 * 1024 * 1024
+
+#   -------------------------------------------------------------------------------------------
+#   Worker functions
+#   -------------------------------------------------------------------------------------------
+#   These run in the worker pool. Every worker process builds the Erlang object of a profile
+#   once with erlang_parallel.MakeErlang and keeps it in Models, keyed on the constructor
+#   parameters. The server only hands valid profiles to the workers.
+#   -------------------------------------------------------------------------------------------
+Models = {}
+
+def Model(params):
+    key = json.dumps(params, sort_keys=True)
+    model = Models.get(key)
+    if model is None:
+        model = Models[key] = erlang_parallel.MakeErlang(params)
+    return model
+
+def ToJson(value):
+    if isinstance(value, dict):
+        return {name: ToJson(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [ToJson(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return value
+
+def Evaluate(params, method, args):
+    return ToJson(getattr(Model(params), method)(*args))
+
+def EvaluateBatch(params, method, columns):
+    return ToJson(getattr(Model(params), BatchMethods[method])(*columns))
+
+def Plan(params, intervals, service_time):
+    return ToJson(Model(params).plan(intervals, service_time))
+
+def Ready():
+    return os.getpid()
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangServer
+#   -------------------------------------------------------------------------------------------
+#   asyncio HTTP/JSON server hosting shared, pre-configured Erlang profiles. Only the parsing and
+#   batching run on the event loop, every solve is handed to a worker pool.
+#
+#   POST /evaluate  {"profile": name, "method": "Agents", "args": [30, 464]}  -> {"result": ...}
+#   POST /plan      {"profile": name, "intervals": [[label, transactions], ...],
+#                    "service_time": 30}                                     -> {"plan": {...}}
+#   GET  /profiles                                                           -> {"profiles": {...}}
+#
+#   /evaluate requests for ErlangB, ErlangC and Traffic with two arguments that arrive within
+#   window seconds of each other are collected per profile and method and evaluated with one
+#   call of the array form (ErlangB_batch, ErlangC_batch, Traffic_batch), which gives the same
+#   values as the scalar methods.
+#   -------------------------------------------------------------------------------------------
+class ErlangServer:
+
+    #   __init__ (dict, str, int, int, float, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   profiles   - dict of profile name to Erlang constructor parameters, either a list in
+    #                constructor order or a dict of keyword arguments
+    #   host       - address to listen on (default 127.0.0.1, local only)
+    #   port       - port to listen on, 0 picks a free port (see port after Start)
+    #   workers    - number of worker processes, default os.cpu_count(). With 0 workers the
+    #                solves run in a single thread of the server process.
+    #   window     - seconds to collect concurrent requests into one batch (default 0.002)
+    #   batch_size - a batch is evaluated at once when it reaches this size (default 1024)
+    #   -------------------------------------------------------------------------------------------
+    #   Every profile is validated with ErlangParams. Invalid profiles are kept in invalid with
+    #   their error, requests for them are answered with 400 and the error.
+    #   -------------------------------------------------------------------------------------------
+    def __init__(self, profiles, host='127.0.0.1', port=8080, workers=None, window=0.002, batch_size=1024):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 0 or window < 0:
+            raise ValueError("workers and window cannot be less than 0!")
+        if batch_size < 1:
+            raise ValueError("batch_size must be larger than 0!")
+        self.profiles   = dict(profiles)
+        self.invalid    = {}
+        for name, params in self.profiles.items():
+            try:
+                erlang_parallel.MakeParams(params)
+            except (ValueError, TypeError) as e:
+                self.invalid[name] = str(e)
+        self.host       = host
+        self.port       = port
+        self.workers    = workers
+        self.window     = window
+        self.batch_size = batch_size
+        self.executor   = None
+        self.server     = None
+        self.pending    = {}
+
+    async def Start(self):
+        if self.workers == 0:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            # spawned workers do not inherit the sockets of open connections, a forked worker
+            # would keep them open after the server closes them
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            # start all workers up front instead of on the first requests
+            await asyncio.gather(*[self.Submit(Ready) for i in range(self.workers)])
+        self.server = await asyncio.start_server(self.Handle, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def Stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    async def Serve(self):
+        await self.Start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.Stop()
+
+    #   -------------------------------------------------------------------------------------------
+    #   Submit (function, ...)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (awaitable) - the result of the function run in the worker pool.
+    #   -------------------------------------------------------------------------------------------
+    def Submit(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Batch (str, str, list)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (awaitable) - the result for args, evaluated together with the other requests for
+    #                         the same profile and method that arrive within the batch window.
+    #   -------------------------------------------------------------------------------------------
+    def Batch(self, profile, method, args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (profile, method)
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = []
+            loop.call_later(self.window, self.Flush, key)
+        batch.append((args, future))
+        if len(batch) >= self.batch_size:
+            self.Flush(key)
+        return future
+
+    def Flush(self, key):
+        batch = self.pending.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self.RunBatch(key, batch))
+
+    async def RunBatch(self, key, batch):
+        profile, method = key
+        columns = [list(column) for column in zip(*[args for args, future in batch])]
+        try:
+            results = await self.Submit(EvaluateBatch, self.profiles[profile], method, columns)
+        except Exception as e:
+            for args, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (args, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Dispatch (str, str, dict)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - the JSON response for a request, raises RequestError for bad requests.
+    #   -------------------------------------------------------------------------------------------
+    async def Dispatch(self, verb, path, body):
+        if path == '/profiles':
+            if verb != 'GET':
+                raise RequestError(405, "Use GET for /profiles!")
+            return {'profiles': self.profiles}
+        if path not in ('/evaluate', '/plan'):
+            raise RequestError(404, "Unknown path {}!".format(path))
+        if verb != 'POST':
+            raise RequestError(405, "Use POST for {}!".format(path))
+        if not isinstance(body, dict):
+            raise RequestError(400, "The request body must be a JSON object!")
+        profile = body.get('profile')
+        if profile not in self.profiles:
+            raise RequestError(400, "Unknown profile {}!".format(profile))
+        if profile in self.invalid:
+            raise RequestError(400, "Invalid profile {}: {}".format(profile, self.invalid[profile]))
+        params = self.profiles[profile]
+        if path == '/plan':
+            intervals = body.get('intervals')
+            service_time = body.get('service_time')
+            if not isinstance(intervals, list) or not isinstance(service_time, (int, float)):
+                raise RequestError(400, "/plan needs intervals and service_time!")
+            return {'plan': await self.Submit(Plan, params, intervals, service_time)}
+        method = body.get('method')
+        args = body.get('args', [])
+        if method not in Methods:
+            raise RequestError(400, "Unknown method {}!".format(method))
+        if not isinstance(args, list):
+            raise RequestError(400, "args must be a list!")
+        if method in BatchMethods and len(args) == 2 and all(isinstance(arg, (int, float)) for arg in args):
+            return {'result': await self.Batch(profile, method, args)}
+        return {'result': await self.Submit(Evaluate, params, method, args)}
+
+    #   -------------------------------------------------------------------------------------------
+    #   Handle (StreamReader, StreamWriter)
+    #   -------------------------------------------------------------------------------------------
+    #   Minimal HTTP/1.1 handling: one request per connection, JSON request and response bodies.
+    #   -------------------------------------------------------------------------------------------
+    async def Handle(self, reader, writer):
+        status = 200
+        try:
+            try:
+                line = (await reader.readline()).decode('latin-1').split()
+                if len(line) != 3:
+                    raise RequestError(400, "Malformed request line!")
+                verb, path = line[0].upper(), line[1].split('?')[0]
+                length = 0
+                while True:
+                    header = (await reader.readline()).decode('latin-1').strip()
+                    if not header:
+                        break
+                    name, _, value = header.partition(':')
+                    if name.strip().lower() == 'content-length':
+                        length = int(value)
+                if length > MaxBody:
+                    raise RequestError(413, "Request body too large!")
+                body = None
+                if length > 0:
+                    body = json.loads(await reader.readexactly(length))
+                response = await self.Dispatch(verb, path, body)
+            except RequestError as e:
+                status, response = e.status, {'error': str(e)}
+            except (ValueError, TypeError, UnicodeDecodeError) as e:
+                status, response = 400, {'error': str(e)}
+            except Exception as e:
+                status, response = 500, {'error': '{}: {}'.format(type(e).__name__, e)}
+            payload = json.dumps(response).encode('utf-8')
+            writer.write(('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                          'Content-Length: {}\r\nConnection: close\r\n\r\n')
+                         .format(status, Reasons[status], len(payload)).encode('latin-1') + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Erlang profiles over a local HTTP/JSON API.")
+    parser.add_argument('profiles', help="JSON file with a dict of profile name to Erlang constructor parameters")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, 0 solves in a thread")
+    parser.add_argument('--window', type=float, default=0.002, help="batch window in seconds")
+    args = parser.parse_args()
+    with open(args.profiles) as f:
+        profiles = json.load(f)
+    server = ErlangServer(profiles, args.host, args.port, args.workers, args.window)
+    for name, error in server.invalid.items():
+        print("Invalid profile {}: {}".format(name, error))
+    print("Serving {} profiles on http://{}:{}".format(len(profiles) - len(server.invalid), args.host, args.port))
+    try:
+        asyncio.run(server.Serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# Erlang Library for contact center operations forecasting
+# Discrete-event simulation of a contact center queue
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import heapq
+import math
+import numpy as np
+import erlang_parallel
+
+# KPIs reported by Simulate, named like the keys of Erlang.IntervalKPI
+Kpis = ('utilisation', 'sla', 'asa', 'abandon', 'queued', 'queue_time', 'queue_size')
+
+#   -------------------------------------------------------------------------------------------
+#   Simulate (Erlang, int, float, int, int, int, bool, int)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang       = Erlang object with the queue parameters
+#       agents       = number of agents available
+#       transactions = the number of transactions received per interval
+#       service_time = target answer time in seconds e.g. 15
+#       intervals    = number of consecutive intervals simulated at this load (default 100)
+#       seed         = seed of the random numbers, the same seed gives the same result
+#       abandon      = callers hang up once their patience runs out (default True). Without
+#                      abandonment the model is the M/M/n queue of ErlangC.
+#       warmup       = number of intervals at the start left out of the KPIs (default 1)
+#   -------------------------------------------------------------------------------------------
+#   Parameters provided in Class Constructor:
+#       ait      = talk time, exponentially distributed with this mean
+#       aiw      = wrap time, exponentially distributed with this mean
+#       abnt     = patience of a caller, exponentially distributed with this mean
+#       ccc      = concurrent transactions per agent, every agent has ccc slots
+#       interval = the forecasting interval 15, 30, 45, 60 minutes.
+#   -------------------------------------------------------------------------------------------
+#   Calls arrive as a Poisson process and are answered first come, first served by the first
+#   free slot. The call records (arrival, talk, wrap, patience, wait) are numpy arrays and the
+#   times the slots become free are kept in a heap. Answering the calls in arrival order from
+#   that heap gives the exact start times of the FIFO queue: a caller that abandons does not
+#   use a slot, so it does not delay the callers behind it.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - calls (number of calls counted) and the KPIs of Kpis in the units of the
+#                    Erlang methods: fractions for utilisation, sla, abandon and queued, seconds
+#                    for asa (answered calls) and queue_time (calls that had to wait) and the
+#                    average number of callers waiting for queue_size.
+#   -------------------------------------------------------------------------------------------
+def Simulate(erlang, agents, transactions, service_time, intervals=100, seed=None, abandon=True, warmup=1):
+    if agents < 1:
+        raise ValueError("agents must be larger than 0!")
+    if transactions < 0:
+        raise ValueError(''.join(erlang.err_val_ltz))
+    if intervals <= warmup or warmup < 0:
+        raise ValueError("intervals must be larger than warmup!")
+    rng      = np.random.default_rng(seed)
+    duration = intervals * erlang.interval
+    start    = warmup * erlang.interval
+    slots    = int(agents * erlang.ccc)
+    # call records
+    calls    = rng.poisson(transactions * intervals)
+    arrival  = np.sort(rng.uniform(0, duration, calls))
+    handle   = rng.exponential(erlang.ait, calls)
+    if erlang.aiw > 0:
+        handle += rng.exponential(erlang.aiw, calls)
+    patience = rng.exponential(erlang.abnt, calls) if abandon else np.full(calls, math.inf)
+    wait     = np.zeros(calls)
+    answered = np.zeros(calls, dtype=bool)
+    # times the slots become free
+    free = [0.0] * slots
+    waits = wait.tolist()
+    for i, (t, h, p) in enumerate(zip(arrival.tolist(), handle.tolist(), patience.tolist())):
+        first = free[0]
+        if first > t:
+            if first - t > p:
+                waits[i] = p
+                continue
+            t_start = first
+        else:
+            t_start = t
+        heapq.heapreplace(free, t_start + h)
+        waits[i] = t_start - t
+        answered[i] = True
+    wait[:] = waits
+    # KPIs over the calls arriving after the warm up
+    counted = arrival >= start
+    n = int(np.count_nonzero(counted))
+    result = {'calls': n}
+    if n == 0:
+        result.update({name: 0.0 for name in Kpis})
+        return result
+    wait, answered, handle = wait[counted], answered[counted], handle[counted]
+    queued = (answered & (wait > 0)) | ~answered
+    result['utilisation'] = min(1.0, float(handle[answered].sum()) / (slots * (duration - start)))
+    result['sla']         = float(np.count_nonzero(answered & (wait <= service_time))) / n
+    result['asa']         = float(wait[answered].mean()) if answered.any() else 0.0
+    result['abandon']     = float(np.count_nonzero(~answered)) / n
+    result['queued']      = float(np.count_nonzero(queued)) / n
+    result['queue_time']  = float(wait[queued].mean()) if queued.any() else 0.0
+    # Little's law - the time spent waiting by all callers over the time simulated
+    result['queue_size']  = float(wait.sum()) / (duration - start)
+    return result
+
+#   -------------------------------------------------------------------------------------------
+#   SimulateQueue (dict)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       queue = simulation configuration with the keys params (see erlang_parallel.PlanQueue),
+#               agents, transactions, service_time and optionally intervals, seed, abandon
+#               and warmup, see Simulate
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - the result of Simulate.
+#   -------------------------------------------------------------------------------------------
+def SimulateQueue(queue):
+    ec = erlang_parallel.MakeErlang(queue['params'])
+    return Simulate(ec, queue['agents'], queue['transactions'], queue['service_time'],
+                    queue.get('intervals', 100), queue.get('seed'), queue.get('abandon', True),
+                    queue.get('warmup', 1))
+
+#   -------------------------------------------------------------------------------------------
+#   Replicate (list or dict, int, float, int, int, int, int, bool, int, int)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       params       = Erlang constructor parameters, see erlang_parallel.PlanQueue
+#       agents       = number of agents available
+#       transactions = the number of transactions received per interval
+#       service_time = target answer time in seconds e.g. 15
+#       replications = number of independent runs (default 10)
+#       intervals    = number of intervals per run (default 100)
+#       seed         = seed of the runs, every run gets its own stream derived from it
+#       abandon      = callers hang up once their patience runs out (default True)
+#       warmup       = number of intervals at the start of a run left out (default 1)
+#       workers      = number of worker processes, see erlang_parallel.PlanQueues
+#   -------------------------------------------------------------------------------------------
+#   The runs are spread over a process pool. The result does not depend on the number of
+#   workers, only on the seed.
+#   -------------------------------------------------------------------------------------------
+#   Returns (dict) - calls (total counted), runs (the result of every run), and for each KPI
+#                    the mean over the runs and its standard error (<kpi>_se). analytic holds
+#                    the Erlang C values of the KPIs for comparison, for ccc = 1 only.
+#   -------------------------------------------------------------------------------------------
+def Replicate(params, agents, transactions, service_time, replications=10, intervals=100, seed=None,
+              abandon=True, warmup=1, workers=None):
+    if replications < 1:
+        raise ValueError("replications must be larger than 0!")
+    seeds = np.random.SeedSequence(seed).spawn(replications)
+    queues = [{'params': params, 'agents': agents, 'transactions': transactions,
+               'service_time': service_time, 'intervals': intervals, 'abandon': abandon,
+               'warmup': warmup, 'seed': int(child.generate_state(1)[0])} for child in seeds]
+    runs = erlang_parallel.MapQueues(SimulateQueue, queues, workers)
+    result = {'calls': sum(run['calls'] for run in runs), 'runs': runs}
+    for name in Kpis:
+        values = np.array([run[name] for run in runs])
+        result[name] = float(values.mean())
+        result[name + '_se'] = float(values.std(ddof=1) / math.sqrt(len(values))) if len(values) > 1 else 0.0
+    ec = erlang_parallel.MakeErlang(params)
+    # with ccc > 1 the simulation has agents * ccc slots, each busy for ait + aiw, while the Erlang
+    # class has agents servers with aht = ait / ccc + aiw * ccc, so the values are not comparable
+    if ec.ccc <= 1:
+        C = ec.ErlangC(agents, transactions / ec.deathrate)
+        result['analytic'] = ec.IntervalKPI(agents, transactions, service_time, C)
+    return result
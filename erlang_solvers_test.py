@@ -0,0 +1,188 @@
+# Erlang Library for contact center operations forecasting
+# Regression checks of the staffing solvers against straightforward reference scans
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+#
+# Run with: python -m unittest erlang_solvers_test
+
+import math
+import unittest
+import numpy as np
+import erlang_c
+
+# (sla, tta, ait, aiw, abnt, max_wait, nv, ccc, interval, ops_hrs)
+Profiles = {'voice 60': (0.80, 30, 300, 40, 20, 30, False, 1, 60, 16),
+            'voice 15': (0.90, 20, 240, 30, 60, 120, False, 1, 15, 24),
+            'chat 30':  (0.70, 60, 600, 60, 120, 300, True, 3, 30, 8)}
+Volumes = list(range(0, 400, 7)) + [463, 464, 910, 1500, 2271]
+ServiceTime = 30
+Tolerance = 1E-12
+
+#   -------------------------------------------------------------------------------------------
+#   Reference scans
+#   -------------------------------------------------------------------------------------------
+#   The solvers as they were written before the incremental and bisection rewrites: ErlangB is
+#   run from scratch for every number of servers and the agents, trunks and call loads are
+#   counted one at a time.
+#   -------------------------------------------------------------------------------------------
+def ErlangB(servers, intensity):
+    B = 0.0
+    last = 1
+    for i in range(1, int(servers) + 1):
+        B = (intensity * last) / (i + (intensity * last))
+        last = B
+    return min(max(B, 0), 1)
+
+def ErlangC(agents, intensity):
+    B = ErlangB(agents, intensity)
+    C = B / (((intensity / agents) * B) + (1 - (intensity / agents)))
+    return min(max(C, 0), 1)
+
+def StartAgents(ec, transactions):
+    trafficrate = transactions / ec.deathrate
+    erlangs = int((transactions * ec.aht) / ec.interval + 0.5)
+    agents = max(erlangs, 1)
+    while trafficrate / agents >= 1:
+        agents += 1
+    return agents
+
+def ServiceLevel(ec, agents, transactions, service_time):
+    trafficrate = transactions / ec.deathrate
+    C = ErlangC(agents, trafficrate)
+    return min(max(1 - C * math.exp((trafficrate - agents) * service_time / ec.aht), 0), 1)
+
+def Agents(ec, service_time, transactions):
+    sla = min(ec.sla, 1)
+    agents = StartAgents(ec, transactions)
+    while True:
+        sl = ServiceLevel(ec, agents, transactions, service_time)
+        if sl >= sla or sl > 1 - ec.MaxAccuracy:
+            return agents
+        agents += 1
+
+def AgentASA(ec, asa, transactions):
+    trafficrate = transactions / ec.deathrate
+    agents = StartAgents(ec, transactions)
+    while True:
+        C = ErlangC(agents, trafficrate)
+        answertime = C / (agents * ec.deathrate * (1 - trafficrate / agents))
+        if answertime * ec.interval < asa:
+            return agents
+        agents += 1
+
+def FractionalAgents(ec, service_time, transactions):
+    sla = min(ec.sla, 1)
+    agents = StartAgents(ec, transactions)
+    sl = 0
+    while True:
+        last = sl
+        sl = ServiceLevel(ec, agents, transactions, service_time)
+        if sl >= sla or sl > 1 - ec.MaxAccuracy:
+            break
+        agents += 1
+    if sl > sla:
+        return ((sla - last) / (sl - last)) + (agents - 1)
+    return agents
+
+def Trunks(start, intensity, blocking, max_trunks=erlang_c.Erlang.MaxTrunks):
+    i = start
+    while i < max_trunks:
+        if ErlangB(i, intensity) <= blocking:
+            break
+        i += 1
+    return i
+
+def CallCapacity(calls, limit, solve):
+    while solve(calls) > limit and calls > 0:
+        calls -= 1
+    return calls
+
+class SolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.erlangs = {name: erlang_c.Erlang(*params) for name, params in Profiles.items()}
+
+    def assertClose(self, value, expected, message=None):
+        self.assertLessEqual(abs(value - expected), Tolerance * max(abs(expected), 1), message)
+
+    def test_erlang_b_and_c(self):
+        ec = self.erlangs['voice 60']
+        for servers in (1, 2, 10, 57, 200):
+            for intensity in (0.5, 9.5, 48.7, 150.0):
+                self.assertClose(ec.ErlangB(servers, intensity), ErlangB(servers, intensity))
+                if intensity < servers:
+                    self.assertClose(ec.ErlangC(servers, intensity), ErlangC(servers, intensity))
+
+    def test_batch_matches_reference(self):
+        ec = self.erlangs['voice 60']
+        servers, intensity = np.meshgrid(np.arange(1, 120, 7), np.linspace(0.5, 110, 23))
+        B = ec.ErlangB_batch(servers, intensity)
+        C = ec.ErlangC_batch(servers, intensity)
+        for n, A, b, c in zip(servers.ravel(), intensity.ravel(), B.ravel(), C.ravel()):
+            self.assertClose(b, ErlangB(n, A), (n, A))
+            if A < n:
+                self.assertClose(c, ErlangC(n, A), (n, A))
+
+    def test_agents(self):
+        for name, ec in self.erlangs.items():
+            batch, C = ec.AgentsErlangC_batch(ServiceTime, Volumes)
+            for transactions, agents in zip(Volumes, batch.tolist()):
+                expected = Agents(ec, ServiceTime, transactions)
+                self.assertEqual(ec.Agents(ServiceTime, transactions), expected, (name, transactions))
+                self.assertEqual(agents, expected, (name, transactions))
+
+    def test_agent_asa(self):
+        for name, ec in self.erlangs.items():
+            for transactions in Volumes:
+                self.assertEqual(ec.AgentASA(20, transactions), AgentASA(ec, 20, transactions),
+                                 (name, transactions))
+
+    def test_fractional_agents(self):
+        for name, ec in self.erlangs.items():
+            for transactions in Volumes:
+                self.assertClose(ec.FractionalAgents(ServiceTime, transactions),
+                                 FractionalAgents(ec, ServiceTime, transactions), (name, transactions))
+
+    def test_trunk_search(self):
+        ec = self.erlangs['voice 60']
+        for intensity in (0.0, 0.3, 1.0, 7.5, 42.0, 180.25, 900.0):
+            for blocking in (0.001, 0.01, 0.05, 0.2):
+                expected = Trunks(math.ceil(intensity), intensity, blocking)
+                self.assertEqual(ec.NBTrunks(intensity, blocking), expected, (intensity, blocking))
+            self.assertEqual(ec.NumberTrunks(intensity, 40), Trunks(40, intensity, 0.001), intensity)
+
+    def test_capacity_search(self):
+        for name, ec in self.erlangs.items():
+            agents = list(range(0, 40, 3))
+            batch = ec.CallCapacity_batch(agents, ServiceTime).tolist()
+            fractional = ec.FractionalCallCapacity_batch(ServiceTime, agents).tolist()
+            for i, limit in enumerate(agents):
+                calls = math.ceil(ec.interval / ec.aht) * limit
+                expected = CallCapacity(calls, limit, lambda x: ec.Agents(ServiceTime, x))
+                self.assertEqual(ec.CallCapacity(limit, ServiceTime), expected, (name, limit))
+                self.assertEqual(batch[i], expected, (name, limit))
+                calls = math.ceil(ec.interval / ec.aht * limit)
+                expected = CallCapacity(calls, limit, lambda x: ec.FractionalAgents(ServiceTime, x))
+                self.assertEqual(ec.FractionalCallCapacity(ServiceTime, limit), expected, (name, limit))
+                self.assertEqual(fractional[i], expected, (name, limit))
+
+    def test_interval_kpi_batch(self):
+        for name, ec in self.erlangs.items():
+            agents, C = ec.AgentsErlangC_batch(ServiceTime, Volumes)
+            kpi = ec.IntervalKPI_batch(agents, Volumes, ServiceTime, C)
+            for i, transactions in enumerate(Volumes):
+                expected = ec.IntervalKPI(int(agents[i]), transactions, ServiceTime, float(C[i]))
+                for key, value in expected.items():
+                    self.assertClose(float(kpi[key][i]), value, (name, transactions, key))
+
+    def test_cached_batch(self):
+        for quantum in (0, 0.5, 2):
+            ec = erlang_c.Erlang(*Profiles['voice 60'])
+            ec.EnableCache(4096, quantum)
+            agents, C = ec.AgentsErlangC_batch(ServiceTime, Volumes)
+            for transactions, n, c in zip(Volumes, agents.tolist(), C.tolist()):
+                self.assertEqual((n, c), tuple(ec.AgentsErlangC(ServiceTime, transactions)),
+                                 (quantum, transactions))
+
+if __name__ == '__main__':
+    unittest.main()
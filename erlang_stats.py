@@ -0,0 +1,145 @@
+# Erlang Library for contact center operations forecasting
+# Opt-in call, latency and iteration statistics of Erlang methods
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import time
+from collections import deque
+
+# methods of Erlang that are counted and timed once statistics are enabled
+Methods = ('ErlangB', 'ErlangBExt', 'EngsetB', 'ErlangC', 'NBTrunks', 'NumberTrunks', 'NumberAgents',
+           'Traffic', 'LoopingTraffic', 'Abandon', 'Agents', 'AgentsErlangC', 'AgentASA', 'ASA',
+           'CallCapacity', 'FractionalAgents', 'FractionalCallCapacity', 'Queued', 'QueueSize',
+           'QueueTime', 'ServiceTime', 'SLA', 'Trunks', 'Utilisation', 'IntervalKPI', 'plan',
+           'ErlangB_batch', 'ErlangC_batch', 'Traffic_batch', 'CallCapacity_batch',
+           'FractionalCallCapacity_batch', 'AgentsErlangC_batch', 'IntervalKPI_batch', 'ErlangCStable',
+           'ErlangCStable_batch')
+Quantiles = (0.5, 0.9, 0.99)
+Prefix    = 'erlang'
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangStats
+#   -------------------------------------------------------------------------------------------
+#   Statistics of one Erlang object, see Erlang.EnableStats. Per method it keeps the number of
+#   calls, the total time, the most recent latencies (for the quantiles) and the number of
+#   inner loop iterations (ErlangB recurrence steps, agents tried, solver steps). Times and
+#   iterations of a method include the methods it calls, so Agents also shows the ErlangB steps
+#   made for it. Unlike the result cache, the statistics of an object are not thread safe.
+#   -------------------------------------------------------------------------------------------
+class ErlangStats:
+    # number of most recent latencies kept per method
+    Samples = 4096
+
+    #   __init__ (str, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   label   - name of the queue or profile, exported as the queue label
+    #   samples - number of most recent latencies kept per method for the quantiles
+    def __init__(self, label=None, samples=Samples):
+        if samples < 1:
+            raise ValueError("samples must be larger than 0!")
+        self.label   = label
+        self.samples = samples
+        # method name -> [calls, seconds, iterations, latencies]
+        self.methods = {}
+        # records of the methods currently running, innermost last
+        self.running = []
+
+    def Record(self, name):
+        record = self.methods.get(name)
+        if record is None:
+            record = self.methods[name] = [0, 0.0, 0, deque(maxlen=self.samples)]
+        return record
+
+    #   -------------------------------------------------------------------------------------------
+    #   Wrap (str, function)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (function) - function counted and timed under name.
+    #   -------------------------------------------------------------------------------------------
+    def Wrap(self, name, function):
+        record  = self.Record(name)
+        running = self.running
+        clock   = time.perf_counter
+
+        def Timed(*args, **kwargs):
+            running.append(record)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                running.pop()
+                record[0] += 1
+                record[1] += elapsed
+                record[3].append(elapsed)
+        Timed.__name__ = name
+        Timed.__wrapped__ = function
+        return Timed
+
+    #   -------------------------------------------------------------------------------------------
+    #   Iterations (int)
+    #   -------------------------------------------------------------------------------------------
+    #   Adds count inner loop iterations to every method currently running.
+    #   -------------------------------------------------------------------------------------------
+    def Iterations(self, count):
+        for record in self.running:
+            record[2] += count
+
+    def Reset(self):
+        for record in self.methods.values():
+            record[0], record[1], record[2] = 0, 0.0, 0
+            record[3].clear()
+
+    #   -------------------------------------------------------------------------------------------
+    #   Info ()
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - per method that was called: calls, seconds (total), mean, the quantiles
+    #                    p50, p90 and p99 and max of the recent latencies in seconds, and
+    #                    iterations (total).
+    #   -------------------------------------------------------------------------------------------
+    def Info(self):
+        info = {}
+        for name, (calls, seconds, iterations, latencies) in self.methods.items():
+            if calls == 0:
+                continue
+            ordered = sorted(latencies)
+            entry = {'calls': calls, 'seconds': seconds, 'mean': seconds / calls, 'iterations': iterations}
+            for q in Quantiles:
+                entry['p{:g}'.format(q * 100)] = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            entry['max'] = ordered[-1]
+            info[name] = entry
+        return info
+
+#   -------------------------------------------------------------------------------------------
+#   Prometheus (list)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       stats = sequence of ErlangStats (or Erlang objects with statistics enabled), e.g. one
+#               per queue
+#   -------------------------------------------------------------------------------------------
+#   Returns (str) - the statistics in the Prometheus text format: a summary <Prefix>_method_seconds
+#                   with the quantiles of the recent latencies and a counter
+#                   <Prefix>_method_iterations_total, labelled with queue and method.
+#   -------------------------------------------------------------------------------------------
+def Prometheus(stats):
+    seconds = ['# HELP {}_method_seconds Time spent in Erlang methods, including the methods they call.'.format(Prefix),
+               '# TYPE {}_method_seconds summary'.format(Prefix)]
+    iterations = ['# HELP {}_method_iterations_total Inner loop iterations of Erlang methods.'.format(Prefix),
+                  '# TYPE {}_method_iterations_total counter'.format(Prefix)]
+    for item in stats:
+        item = getattr(item, 'stats', item)
+        if item is None:
+            continue
+        queue = '' if item.label is None else str(item.label)
+        for name, entry in item.Info().items():
+            labels = 'queue="{}",method="{}"'.format(Escape(queue), name)
+            for q in Quantiles:
+                seconds.append('{}_method_seconds{{{},quantile="{:g}"}} {!r}'.format(
+                    Prefix, labels, q, entry['p{:g}'.format(q * 100)]))
+            seconds.append('{}_method_seconds_sum{{{}}} {!r}'.format(Prefix, labels, entry['seconds']))
+            seconds.append('{}_method_seconds_count{{{}}} {}'.format(Prefix, labels, entry['calls']))
+            iterations.append('{}_method_iterations_total{{{}}} {}'.format(Prefix, labels, entry['iterations']))
+    return '\n'.join(seconds + iterations) + '\n'
+
+def Escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
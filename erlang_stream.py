@@ -0,0 +1,189 @@
+# Erlang Library for contact center operations forecasting
+# Streaming intraday re-forecast of staffing
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import copy
+
+#   -------------------------------------------------------------------------------------------
+#   StaffingStream
+#   -------------------------------------------------------------------------------------------
+#   Keeps the staffing plan of one day up to date while the actual interval volumes arrive.
+#   Every event (interval, actual_volume, actual_aht) replaces the forecast of that interval by
+#   the actuals and re-forecasts the intervals after the latest actual: their forecast volume is
+#   scaled by the ratio of actual to forecast volume so far and their handle time is the volume
+#   weighted actual handle time so far.
+#
+#   Staffing results are memoised on (volume, aht), so an interval whose inputs did not change
+#   is not solved again and intervals sharing the same inputs are only solved once. Re-forecast
+#   volumes are rounded to whole transactions, which keeps the memo hit rate high. With horizon
+#   set, at most horizon intervals after the latest actual are re-forecast, which bounds the
+#   work per event to horizon + 1 staffing solves.
+#   -------------------------------------------------------------------------------------------
+class StaffingStream:
+
+    #   __init__ (Erlang, list, int, bool, int)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #   erlang       - Erlang object with the queue parameters, its aht is the forecast aht
+    #   intervals    - sequence of (label, transactions) rows of the forecast
+    #   service_time - target answer time in seconds e.g. 15
+    #   reforecast   - re-forecast the remaining intervals from the actuals (default True)
+    #   horizon      - number of intervals after the latest actual that are re-forecast (default all)
+    def __init__(self, erlang, intervals, service_time, reforecast=True, horizon=None):
+        if horizon is not None and horizon < 0:
+            raise ValueError(''.join(erlang.err_val_ltz))
+        self.erlang       = erlang
+        self.service_time = service_time
+        self.reforecast   = reforecast
+        self.horizon      = horizon
+        self.labels       = [label for label, transactions in intervals]
+        self.index        = {label: i for i, label in enumerate(self.labels)}
+        self.forecast     = [transactions for label, transactions in intervals]
+        self.actual       = [None] * len(self.labels)
+        self.volume       = list(self.forecast)
+        self.aht          = [erlang.aht] * len(self.labels)
+        self.memo         = {}
+        self.models       = {erlang.aht: erlang}
+        self.staffing     = [self.Solve(self.volume[i], self.aht[i]) for i in range(len(self.labels))]
+
+    #   -------------------------------------------------------------------------------------------
+    #   Model (float)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (Erlang) - a copy of the Erlang object with the given aht, created once per aht.
+    #                      The copy gets its own result cache so the cache of the original
+    #                      object is left alone.
+    #   -------------------------------------------------------------------------------------------
+    def Model(self, aht):
+        model = self.models.get(aht)
+        if model is None:
+            model = copy.copy(self.erlang)
+            cache = self.erlang.cache is not None
+            model.DisableCache()
+            model.aht       = aht
+            model.deathrate = model.interval / aht
+            if cache:
+                model.EnableCache(self.erlang.cache_capacity, self.erlang.cache_quantum)
+            self.models[aht] = model
+        return model
+
+    #   -------------------------------------------------------------------------------------------
+    #   Solve (float, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (dict) - agents and the interval KPIs (see Erlang.IntervalKPI) for the volume and
+    #                    aht, memoised on (volume, aht).
+    #   -------------------------------------------------------------------------------------------
+    def Solve(self, volume, aht):
+        key = (volume, aht)
+        result = self.memo.get(key)
+        if result is None:
+            model = self.Model(aht)
+            agents, C = model.AgentsErlangC(self.service_time, volume)
+            result = model.IntervalKPI(agents, volume, self.service_time, C)
+            result['agents'] = agents
+            self.memo[key] = result
+        return result
+
+    #   -------------------------------------------------------------------------------------------
+    #   Targets (int)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (list) - (index, volume, aht) of the intervals to update after an event for the
+    #                    interval at index: the interval itself and the re-forecast intervals
+    #                    after the latest actual.
+    #   -------------------------------------------------------------------------------------------
+    def Targets(self, index):
+        volume, aht = self.actual[index]
+        targets = [(index, volume, aht)]
+        if not self.reforecast:
+            return targets
+        # only intervals after the latest actual are re-forecast, a late or corrected actual
+        # for an earlier interval still changes their forecast
+        last = max(i for i, actual in enumerate(self.actual) if actual is not None)
+        actual_volume = 0
+        forecast_volume = 0
+        handled = 0
+        for i, actual in enumerate(self.actual):
+            if actual is not None:
+                actual_volume += actual[0]
+                forecast_volume += self.forecast[i]
+                handled += actual[0] * actual[1]
+        factor = actual_volume / forecast_volume if forecast_volume > 0 else 1
+        aht = handled / actual_volume if actual_volume > 0 else self.erlang.aht
+        stop = len(self.labels)
+        if self.horizon is not None:
+            stop = min(stop, last + 1 + self.horizon)
+        for i in range(last + 1, stop):
+            targets.append((i, int(self.forecast[i] * factor + 0.5), aht))
+        return targets
+
+    #   -------------------------------------------------------------------------------------------
+    #   Update (label, float, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       interval      = label of the interval, as given in the forecast
+    #       actual_volume = actual number of transactions received in the interval
+    #       actual_aht    = actual average handle time in seconds, default the forecast aht
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (list) - one dict per interval whose staffing inputs changed with the keys label,
+    #                    transactions, aht, agents, delta (change in agents) and the interval
+    #                    KPIs. Intervals whose inputs are unchanged are left out.
+    #   -------------------------------------------------------------------------------------------
+    def Update(self, interval, actual_volume, actual_aht=None):
+        if interval not in self.index:
+            raise KeyError("Unknown interval {}!".format(interval))
+        if actual_volume < 0:
+            raise ValueError(''.join(self.erlang.err_val_ltz))
+        if actual_aht is None:
+            actual_aht = self.erlang.aht
+        if actual_aht <= 0:
+            raise ValueError("actual_aht must be larger than 0!")
+        index = self.index[interval]
+        self.actual[index] = (actual_volume, actual_aht)
+        deltas = []
+        for i, volume, aht in self.Targets(index):
+            if volume == self.volume[i] and aht == self.aht[i]:
+                continue
+            previous = self.staffing[i]['agents']
+            result = self.Solve(volume, aht)
+            self.volume[i]   = volume
+            self.aht[i]      = aht
+            self.staffing[i] = result
+            delta = dict(result)
+            delta['label']        = self.labels[i]
+            delta['transactions'] = volume
+            delta['aht']          = aht
+            delta['delta']        = result['agents'] - previous
+            deltas.append(delta)
+        return deltas
+
+    #   -------------------------------------------------------------------------------------------
+    #   Stream (iterable)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       events = iterable of (interval, actual_volume, actual_aht) events, actual_aht may be
+    #                None to keep the forecast aht
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (generator) - yields the list of deltas of each event, see Update.
+    #   -------------------------------------------------------------------------------------------
+    def Stream(self, events):
+        for interval, actual_volume, actual_aht in events:
+            yield self.Update(interval, actual_volume, actual_aht)
+
+    #   -------------------------------------------------------------------------------------------
+    #   AsyncStream (async iterable)
+    #   -------------------------------------------------------------------------------------------
+    #   Same as Stream for an async source of events, e.g. an ACD feed read with asyncio. Every
+    #   update is bounded (see horizon), so it is run directly on the event loop.
+    #   -------------------------------------------------------------------------------------------
+    async def AsyncStream(self, events):
+        async for interval, actual_volume, actual_aht in events:
+            yield self.Update(interval, actual_volume, actual_aht)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Plan ()
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (list) - (label, transactions, aht, agents) of every interval as currently planned.
+    #   -------------------------------------------------------------------------------------------
+    def Plan(self):
+        return [(self.labels[i], self.volume[i], self.aht[i], self.staffing[i]['agents'])
+                for i in range(len(self.labels))]
@@ -0,0 +1,73 @@
+# Erlang Library for contact center operations forecasting
+# What-if sweeps of the staffing over grids of aht, sla, service time and volume
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import numpy as np
+
+#   -------------------------------------------------------------------------------------------
+#   Sweep (Erlang, list, list, list, list)
+#   -------------------------------------------------------------------------------------------
+#   Parameters:
+#       erlang       = Erlang object with the queue parameters (interval, MaxAccuracy)
+#       aht          = average handle times in seconds, e.g. erlang.aht * np.array([1.0, 1.1])
+#       sla          = service level targets, 0 < sla <= 1 e.g. [0.8, 0.9]
+#       service_time = target answer times in seconds e.g. [20, 30]
+#       transactions = numbers of transactions per interval, e.g. the volumes of a day
+#   -------------------------------------------------------------------------------------------
+#   Agents for every combination of the four axes in one pass. The traffic intensity depends on
+#   aht and the volume only, so the ErlangB recurrence is run once per distinct (aht, volume)
+#   pair: it starts at the same number of agents as Erlang.Agents and is extended one agent per
+#   step for all pairs in lockstep. At every step the service level is evaluated for all service
+#   times at once and compared against all sla targets, and a pair drops out once every target
+#   is met. The result is the same as Erlang.Agents on an Erlang object with that aht and sla.
+#   -------------------------------------------------------------------------------------------
+#   Returns (array of int) - agents with shape (len(aht), len(sla), len(service_time),
+#                            len(transactions)).
+#   -------------------------------------------------------------------------------------------
+def Sweep(erlang, aht, sla, service_time, transactions):
+    aht          = np.asarray(aht, dtype=float).ravel()
+    sla          = np.asarray(sla, dtype=float).ravel()
+    service_time = np.asarray(service_time, dtype=float).ravel()
+    transactions = np.asarray(transactions, dtype=float).ravel()
+    if (aht <= 0).any():
+        raise ValueError("aht must be larger than 0!")
+    if ((sla <= 0) | (sla > 1)).any():
+        raise ValueError("sla: 0 < sla <= 1.00!")
+    if (service_time < 0).any() or (transactions < 0).any():
+        raise ValueError(''.join(erlang.err_val_ltz))
+    if aht.size * sla.size * service_time.size * transactions.size == 0:
+        return np.zeros((aht.size, sla.size, service_time.size, transactions.size), dtype=int)
+    # one row per distinct (aht, volume) pair
+    volumes, inverse = np.unique(transactions, return_inverse=True)
+    row_aht = np.repeat(aht, volumes.size)
+    row_vol = np.tile(volumes, aht.size)
+    A = row_vol / (erlang.interval / row_aht)
+    # start at the number of agents for 100% utilisation, below 100% utilisation
+    start = np.maximum(np.floor(row_vol * row_aht / erlang.interval + 0.5), 1)
+    start = np.where(A / start >= 1, np.floor(A) + 1, start)
+    last = start + start * 100 - 1
+    n = start.copy()
+    B = erlang.ErlangB_batch(n, A)
+    result = np.zeros((A.size, sla.size, service_time.size), dtype=int)
+    todo = np.ones(result.shape, dtype=bool)
+    active = np.arange(A.size)
+    limit = 1 - erlang.MaxAccuracy
+    while active.size:
+        a, b, m = A[active], B[active], n[active]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = np.clip(b / (((a / m) * b) + (1 - (a / m))), 0, 1)
+        c = np.where(np.isfinite(c), c, 0.0)
+        # service level of every service time, rows x service times
+        sl = np.maximum(1 - c[:, None] * np.exp((a - m)[:, None] * service_time[None, :] / row_aht[active, None]), 0)
+        met = (sl[:, None, :] >= sla[None, :, None]) | (sl[:, None, :] > limit)
+        met |= (m >= last[active])[:, None, None]
+        new = met & todo[active]
+        result[active] = np.where(new, m[:, None, None].astype(int), result[active])
+        todo[active] &= ~new
+        active = active[todo[active].any(axis=(1, 2))]
+        x = A[active] * B[active]
+        n[active] += 1
+        B[active] = x / (n[active] + x)
+    agents = result.reshape(aht.size, volumes.size, sla.size, service_time.size)[:, inverse]
+    return np.ascontiguousarray(agents.transpose(0, 2, 3, 1))
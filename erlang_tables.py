@@ -0,0 +1,254 @@
+# Erlang Library for contact center operations forecasting
+# Precomputed Erlang B tables - traffic per trunks and blocking level
+# Copyright (c) 2020 by Peter Gossler
+# Version 0.1.0
+
+import math
+from bisect import bisect_left
+import numpy as np
+import erlang_c
+import erlang_lookup
+
+# blocking levels of the printed Erlang B tables
+Blocking = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.003, 0.005, 0.007, 0.01, 0.012, 0.015, 0.02,
+            0.025, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09, 0.1, 0.12, 0.15, 0.2, 0.25, 0.3, 0.35,
+            0.4, 0.45, 0.5)
+
+#   -------------------------------------------------------------------------------------------
+#   ErlangBTable
+#   -------------------------------------------------------------------------------------------
+#   Erlang B table: the offered traffic that 1 .. max_trunks trunks carry at each blocking level,
+#   as Erlang.Traffic returns it. Both questions engineers look up in a printed table are
+#   answered from it by indexing and sorted search:
+#       Traffic (trunks, blocking)    - the most traffic the trunks carry at the blocking level
+#       Trunks (intensity, blocking)  - the trunks needed for the traffic, as Erlang.NBTrunks
+#   Values outside the table (more trunks, other blocking levels) are calculated with the
+#   Erlang methods. Tables are saved in the binary file format of erlang_lookup and memory-
+#   mapped when loaded.
+#   -------------------------------------------------------------------------------------------
+class ErlangBTable:
+    # ratio of neighbouring intensities of the grid swept by Build, and the step of its square
+    # roots: B(n, A) changes over a range of A that grows like sqrt(n) for many trunks
+    GridRatio = 2 ** (1 / 256)
+    GridRoot  = 0.01
+
+    #   __init__ (dict, dict)
+    #   -------------------------------------------------------------------------------------------
+    #   Use ErlangBTable.Build to calculate a table and ErlangBTable.Load to open a saved one.
+    #   -------------------------------------------------------------------------------------------
+    def __init__(self, meta, columns):
+        self.meta       = meta
+        self.columns    = columns
+        self.max_trunks = meta['max_trunks']
+        self.blocking   = np.asarray(columns['blocking'])
+        # traffic[k, n - 1] is the traffic of n trunks at blocking level k
+        self.traffic    = np.asarray(columns['traffic']).reshape(self.blocking.size, self.max_trunks)
+        self.levels     = {value: k for k, value in enumerate(self.blocking.tolist())}
+        # rows as lists for scalar queries, filled on first use
+        self.rows       = {}
+        # used for values outside of the table
+        self.erlang     = erlang_c.Erlang(*meta['params'])
+
+    #   -------------------------------------------------------------------------------------------
+    #   Build (Erlang, int, list)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       erlang     = Erlang object used for values outside of the table
+    #       max_trunks = largest number of trunks in the table (default 10,000)
+    #       blocking   = blocking levels, 0 < blocking < 1 (default Blocking, 30 levels)
+    #   -------------------------------------------------------------------------------------------
+    #   The ErlangB recurrence is swept once over the trunks for a grid of intensities, all
+    #   intensities in lockstep. After each step B(n, A) is known for the whole grid and grows
+    #   with A, so the grid cells where B crosses each blocking level are found by a sorted search.
+    #   Inside the cell log B is a smooth function of log A with the known slope
+    #       d log(B) / d log(A) = n - A * (1 - B)
+    #   at both ends, and the crossing is solved on its cubic Hermite interpolation. Intensities
+    #   below the crossing of the smallest level are never needed again and leave the sweep. The
+    #   table agrees with Erlang.Traffic to a relative error of about 1E-10.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (ErlangBTable) - the table.
+    #   -------------------------------------------------------------------------------------------
+    @classmethod
+    def Build(cls, erlang, max_trunks=10000, blocking=Blocking):
+        max_trunks = int(max_trunks)
+        if max_trunks < 1:
+            raise ValueError("max_trunks must be larger than 0!")
+        blocking = np.unique(np.asarray(blocking, dtype=float))
+        if blocking.size == 0 or blocking[0] <= 0 or blocking[-1] >= 1:
+            raise ValueError("blocking: 0 < blocking < 1!")
+        # one trunk carries b / (1 - b), n trunks carry less than n / (1 - b)
+        low = blocking[0] / (1 - blocking[0]) / 2
+        high = max_trunks / (1 - blocking[-1]) * 2
+        count = int(math.ceil(math.log(high / low) / math.log(cls.GridRatio))) + 1
+        roots = np.arange(1, math.sqrt(high) + cls.GridRoot, cls.GridRoot)
+        A = np.union1d(low * cls.GridRatio ** np.arange(count), roots * roots)
+        logA = np.log(A)
+        target = np.log(blocking)
+        B = np.ones(A.size)
+        traffic = np.zeros((blocking.size, max_trunks))
+        first = 0
+        with np.errstate(divide='ignore'):
+            for n in range(1, max_trunks + 1):
+                x = A[first:] * B[first:]
+                B[first:] = x / (n + x)
+                # first cell end above each level, B[j - 1] <= blocking < B[j]
+                j = first + np.searchsorted(B[first:], blocking, side='right')
+                first = j[0] - 1
+                x0, x1 = logA[j - 1], logA[j]
+                y0, y1 = np.log(B[j - 1]) - target, np.log(B[j]) - target
+                d0 = (n - A[j - 1] * (1 - B[j - 1])) * (x1 - x0)
+                d1 = (n - A[j] * (1 - B[j])) * (x1 - x0)
+                traffic[:, n - 1] = np.exp(x0 + (x1 - x0) * cls.HermiteRoot(y0, y1, d0, d1))
+        columns = {'blocking': blocking, 'traffic': traffic.ravel()}
+        meta = {'params': erlang_lookup.StaffingTable.Params(erlang), 'max_trunks': max_trunks}
+        return cls(meta, columns)
+
+    #   -------------------------------------------------------------------------------------------
+    #   HermiteRoot (array, array, array, array)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (array) - the root t in [0, 1] of the cubic with values y0, y1 and slopes d0, d1
+    #                     at t = 0 and t = 1, for y0 <= 0 < y1 and positive slopes, by Newton
+    #                     steps from the linear interpolation.
+    #   -------------------------------------------------------------------------------------------
+    @staticmethod
+    def HermiteRoot(y0, y1, d0, d1):
+        t = np.clip(-y0 / (y1 - y0), 0, 1)
+        for i in range(4):
+            t2, t3 = t * t, t * t * t
+            value = ((2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * d0
+                     + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * d1)
+            slope = ((6 * t2 - 6 * t) * y0 + (3 * t2 - 4 * t + 1) * d0
+                     + (-6 * t2 + 6 * t) * y1 + (3 * t2 - 2 * t) * d1)
+            t = np.clip(t - value / slope, 0, 1)
+        return t
+
+    def Save(self, path):
+        erlang_lookup.WriteArrays(path, self.meta, self.columns)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Load (str)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (ErlangBTable) - the table saved in path, with its columns memory-mapped.
+    #   -------------------------------------------------------------------------------------------
+    @classmethod
+    def Load(cls, path):
+        meta, columns = erlang_lookup.MapArrays(path)
+        return cls(meta, columns)
+
+    #   -------------------------------------------------------------------------------------------
+    #   Row (float)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (list) - the traffic of 1 .. max_trunks trunks at blocking as a list, or None if
+    #                    blocking is not a level of the table.
+    #   -------------------------------------------------------------------------------------------
+    def Row(self, blocking):
+        row = self.rows.get(blocking)
+        if row is None:
+            level = self.levels.get(blocking)
+            if level is None:
+                return None
+            row = self.rows[blocking] = self.traffic[level].tolist()
+        return row
+
+    #   -------------------------------------------------------------------------------------------
+    #   TrafficLookup (float), TrunksLookup (float)
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (function) - Traffic (trunks) or Trunks (intensity) for single values at one
+    #                        blocking level. The row of the level is bound once, so a call is an
+    #                        index or a bisection and nothing else. Use these in loops over many
+    #                        values at the same blocking level.
+    #   -------------------------------------------------------------------------------------------
+    def TrafficLookup(self, blocking):
+        row = self.Row(blocking)
+        erlang = self.erlang
+        if row is None:
+            return lambda trunks: erlang.Traffic(blocking, int(trunks))
+        size = self.max_trunks
+        def traffic(trunks):
+            n = int(trunks)
+            if 1 <= n <= size:
+                return row[n - 1]
+            return erlang.Traffic(blocking, n)
+        return traffic
+
+    def TrunksLookup(self, blocking):
+        row = self.Row(blocking)
+        erlang = self.erlang
+        if row is None:
+            return lambda intensity: erlang.NBTrunks(intensity, blocking)
+        top = row[-1]
+        def trunks(intensity):
+            if 0 <= intensity <= top:
+                n = bisect_left(row, intensity) + 1
+                start = int(intensity + 0.9999)
+                if n >= start:
+                    return n if start else 0
+                return start
+            return erlang.NBTrunks(intensity, blocking)
+        return trunks
+
+    #   -------------------------------------------------------------------------------------------
+    #   Traffic (int, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       trunks   = number of trunks, or array of numbers of trunks
+    #       blocking = blocking factor e.g. 0.01, one of the levels of the table for a lookup
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (float or array) - the offered traffic in Erlangs the trunks carry at blocking,
+    #                              see Erlang.Traffic.
+    #   -------------------------------------------------------------------------------------------
+    def Traffic(self, trunks, blocking):
+        if isinstance(trunks, (int, float)):
+            row = self.Row(blocking)
+            n = int(trunks)
+            if row is not None and 1 <= n <= self.max_trunks:
+                return row[n - 1]
+            return self.erlang.Traffic(blocking, n)
+        level = self.levels.get(blocking)
+        values = np.asarray(trunks)
+        n = np.floor(values).astype(np.intp)
+        if level is None:
+            result = np.array([self.erlang.Traffic(blocking, value) for value in n.ravel().tolist()])
+            return result.reshape(values.shape) if values.ndim else result[0]
+        inside = (n >= 1) & (n <= self.max_trunks)
+        if values.ndim == 0:
+            return self.traffic[level, n - 1].item() if inside else self.erlang.Traffic(blocking, n.item())
+        result = self.traffic[level, np.where(inside, n - 1, 0)]
+        for i in np.nonzero(~inside.ravel())[0]:
+            result.flat[i] = self.erlang.Traffic(blocking, n.flat[i].item())
+        return result
+
+    #   -------------------------------------------------------------------------------------------
+    #   Trunks (float, float)
+    #   -------------------------------------------------------------------------------------------
+    #   Parameters:
+    #       intensity = traffic in Erlangs, or array of traffic intensities
+    #       blocking  = blocking factor e.g. 0.01, one of the levels of the table for a lookup
+    #   -------------------------------------------------------------------------------------------
+    #   The traffic of a blocking level grows with the trunks, so the first number of trunks
+    #   carrying the intensity is a sorted search of the level's row. As NBTrunks, the search
+    #   starts at IntCeiling(intensity) trunks, and no trunks are needed when that is 0.
+    #   -------------------------------------------------------------------------------------------
+    #   Returns (int or array) - the number of trunks required, see Erlang.NBTrunks.
+    #   -------------------------------------------------------------------------------------------
+    def Trunks(self, intensity, blocking):
+        if isinstance(intensity, (int, float)):
+            row = self.Row(blocking)
+            if row is None or intensity < 0 or intensity > row[-1]:
+                return self.erlang.NBTrunks(intensity, blocking)
+            start = int(intensity + 0.9999)
+            return max(bisect_left(row, intensity) + 1, start) if start else 0
+        level = self.levels.get(blocking)
+        values = np.asarray(intensity, dtype=float)
+        if level is None or (values < 0).any():
+            result = np.array([self.erlang.NBTrunks(value, blocking) for value in values.ravel().tolist()], dtype=int)
+            return result.reshape(values.shape) if values.ndim else result[0].item()
+        row = self.traffic[level]
+        start = np.floor(values + 0.9999).astype(np.intp)
+        n = np.where(start > 0, np.maximum(np.searchsorted(row, values, side='left') + 1, start), 0)
+        inside = values <= row[-1]
+        if values.ndim == 0:
+            return int(n) if inside else self.erlang.NBTrunks(values.item(), blocking)
+        for i in np.nonzero(~inside.ravel())[0]:
+            n.flat[i] = self.erlang.NBTrunks(values.flat[i].item(), blocking)
+        return n
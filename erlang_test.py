@@ -49,16 +49,18 @@ print ("Queue Size      {}".format(ec.QueueSize(agents, max_call_vol)))
 print ("\nCalculating data set...\n")
 print ("Time   Agents  Utilisation SLA       ASA     Abandoned   Queued    Queue-Time  Queue-Size")
 print ("-----------------------------------------------------------------------------------------")
-for x in call_data:
-    tm = x[0]
-    ag = ec.Agents (service_time, x[1])
-    ut = ec.Utilisation(ag, x[1]) * 100
-    sla = ec.SLA(ag, x[1], service_time) * 100
-    asa = ec.ASA(ag, x[1])
-    abn = ec.Abandon(ag, x[1]) * 100
-    qc = ec.Queued(ag, x[1]) * 100
-    qt = ec.QueueTime(ag, x[1])
-    qs = ec.QueueSize(ag, x[1])
+# plan() staffs all intervals in one call and evaluates ErlangC only once per interval
+day = ec.plan(call_data, service_time)
+for i in range(len(day['label'])):
+    tm = day['label'][i]
+    ag = day['agents'][i]
+    ut = day['utilisation'][i] * 100
+    sla = day['sla'][i] * 100
+    asa = day['asa'][i]
+    abn = day['abandon'][i] * 100
+    qc = day['queued'][i] * 100
+    qt = day['queue_time'][i]
+    qs = day['queue_size'][i]
     print ("{}  {}      {:0.2f}%      {:0.2f}%    {:0}sec   {:0.2f}%      {:0.2f}%    {}          {}".format(tm, ag, ut, sla, asa, abn, qc, qt, qs))
 print ()
 
@@ -112,15 +114,17 @@ print ("Queue Size      {}".format(ec.QueueSize(agents, max_call_vol)))
 print ("\nCalculating data set...\n")
 print ("Time   Agents  Utilisation SLA       ASA     Abandoned   Queued    Queue-Time  Queue-Size")
 print ("-----------------------------------------------------------------------------------------")
-for x in call_data:
-    tm = x[0]
-    ag = ec.Agents (service_time, x[1])
-    ut = ec.Utilisation(ag, x[1]) * 100
-    sla = ec.SLA(ag, x[1], service_time) * 100
-    asa = ec.ASA(ag, x[1])
-    abn = ec.Abandon(ag, x[1]) * 100
-    qc = ec.Queued(ag, x[1]) * 100
-    qt = ec.QueueTime(ag, x[1])
-    qs = ec.QueueSize(ag, x[1])
+# plan() staffs all intervals in one call and evaluates ErlangC only once per interval
+day = ec.plan(call_data, service_time)
+for i in range(len(day['label'])):
+    tm = day['label'][i]
+    ag = day['agents'][i]
+    ut = day['utilisation'][i] * 100
+    sla = day['sla'][i] * 100
+    asa = day['asa'][i]
+    abn = day['abandon'][i] * 100
+    qc = day['queued'][i] * 100
+    qt = day['queue_time'][i]
+    qs = day['queue_size'][i]
     print ("{}  {}      {:0.2f}%      {:0.2f}%    {:0}sec   {:0.2f}%      {:0.2f}%    {}          {}".format(tm, ag, ut, sla, asa, abn, qc, qt, qs))
 print ()